@@ -0,0 +1,88 @@
+"""
+Bookkeeping of articles whose analysis failed, so they aren't retried on every run.
+
+Each failure caused by the article itself (an unparseable or invalid LLM response,
+missing text) is recorded in the analysis_attempts table with the error class, the
+number of attempts so far and when the article may be tried again. Such failures
+back off exponentially; permanent errors (MissingContentError), and articles that
+failed MAX_ATTEMPTS times, are moved to the 'dead' state and are no longer selected.
+A later success removes the row.
+
+Server errors (connection refused, timeouts, HTTP errors, ...) say nothing about the
+article: they are not recorded, so the article stays pending for the next run and an
+outage can't use up its attempts.
+"""
+
+import time
+
+BASE_BACKOFF = 15 * 60   # seconds before the first retry, doubled after each failure
+MAX_BACKOFF = 24 * 3600
+MAX_ATTEMPTS = 6
+
+RETRY = 'retry'
+DEAD = 'dead'
+
+
+class MissingContentError(ValueError):
+    """The article has no text to analyze; retrying won't help."""
+
+
+def init_analysis_attempts_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_attempts (
+            source TEXT,
+            pubDate TEXT,
+            title TEXT,
+            error_class TEXT,
+            error TEXT,
+            attempts INTEGER,
+            next_eligible_ts INTEGER,
+            state TEXT,  -- retry or dead
+            PRIMARY KEY (source, pubDate, title)
+        )
+    ''')
+
+
+def is_article_error(error):
+    """Whether the failure comes from the article or the model's answer, rather than from reaching the server."""
+    # Parse and validation failures are ValueErrors or LookupErrors; requests' errors are OSErrors
+    return isinstance(error, (ValueError, LookupError)) and not isinstance(error, OSError)
+
+
+def is_permanent(error):
+    return isinstance(error, MissingContentError)
+
+
+def record_failures(conn, failures, now=None):
+    """Records [((source, pubDate, title), exception)] and schedules their next attempt; server errors are skipped."""
+    now = int(now if now is not None else time.time())
+    for key, error in failures:
+        if not is_article_error(error):
+            continue
+        row = conn.execute('''
+            SELECT attempts FROM analysis_attempts WHERE source = ? AND pubDate = ? AND title = ?
+        ''', key).fetchone()
+        attempts = (row[0] if row else 0) + 1
+
+        if is_permanent(error) or attempts >= MAX_ATTEMPTS:
+            state, next_eligible_ts = DEAD, None
+        else:
+            state, next_eligible_ts = RETRY, now + min(BASE_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF)
+
+        conn.execute('''
+            INSERT OR REPLACE INTO analysis_attempts
+            (source, pubDate, title, error_class, error, attempts, next_eligible_ts, state)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (*key, type(error).__name__, str(error)[:500], attempts, next_eligible_ts, state))
+
+
+def clear_attempts(conn, keys):
+    """Forgets earlier failures of articles that have now been analyzed."""
+    conn.executemany('''
+        DELETE FROM analysis_attempts WHERE source = ? AND pubDate = ? AND title = ?
+    ''', keys)
+
+
+def attempts_summary(conn):
+    counts = dict(conn.execute('SELECT state, COUNT(*) FROM analysis_attempts GROUP BY state').fetchall())
+    return f"{counts.get(RETRY, 0)} article(s) waiting to be retried, {counts.get(DEAD, 0)} given up on"
@@ -1,20 +1,47 @@
 import argparse
+import queue
 import re
 import sqlite3
 import sys
+import time
 
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import chain
 from pathlib import Path
-import xml.etree.ElementTree as ET
-from bs4 import BeautifulSoup
-from ollama_wrapper import OllamaWrapper
-from llama_cpp_wrapper import LlamaCppWrapper
 
-from utils import generate_filename
+from analysis_attempts import (MissingContentError, attempts_summary, clear_attempts, is_article_error,
+                               init_analysis_attempts_table, record_failures)
+from dedup import DEFAULT_MAX_DISTANCE, FOLLOWING, MAX_DISTANCE, SentimentCache
+from item_text import backfill_item_text
+from utils import migrate_pub_ts
 
 
 # Define Ollama model and session
 MODEL_NAME = "llama3.2"
 
+# Results are written to the sentiment table in batches of this many rows
+WRITE_BATCH_SIZE = 20
+
+# Written results are committed once this many are pending, or this many seconds after the last commit
+COMMIT_EVERY_ITEMS = 200
+COMMIT_EVERY_SECONDS = 60
+
+# Pending rows are read from the database this many at a time
+FETCH_SIZE = 256
+
+# How long a connection waits on a database locked by another writer (e.g. concurrent downloads)
+DB_LOCK_TIMEOUT = 30
+
+# In streaming mode, how long to wait for new items before sending off a partial batch
+QUEUE_POLL_SECONDS = 0.5
+_WAITING = object()  # yielded by the queue reader while no item is available
+
+# The run stops after this many server errors in a row (connection refused, timeouts, ...)
+MAX_CONSECUTIVE_SERVER_ERRORS = 5
+
+# Labels the model may answer with in fast (label-only) mode
+SENTIMENT_LABELS = ["-1", "0", "1"]
+
 
 def parse_sentiment(text):
     # Match an integer at the beginning followed by a space or newline
@@ -38,16 +65,45 @@ def parse_sentiment(text):
     return sentiment, explanation
 
 
+def parse_sentiment_batch(text, count):
+    """
+    Parses a batched response made of "<article number>: <sentiment> <explanation>" lines.
+
+    Returns {index: (sentiment, explanation)} keyed by 0-based article index. Lines that
+    don't parse, or refer to an unknown or already seen article, are skipped, so the
+    caller can retry the missing articles individually.
+    """
+    results = {}
+    for line in text.splitlines():
+        match = re.match(r'(?:article\s*)?(\d+)\s*[:.)]\s*(.+)', line.strip(' \t*#'), re.IGNORECASE)
+        if not match:
+            continue
+
+        index = int(match.group(1)) - 1
+        if not 0 <= index < count or index in results:
+            continue
+
+        try:
+            results[index] = parse_sentiment(match.group(2).strip(' *'))
+        except ValueError:
+            continue
+
+    return results
+
+
+DISTRESS_NOTE = ("Note that the analysis is done for the purpose of determining if the news article is likely "
+                 "to cause distress to the reader so it's important to annotate anything possibly causing distress as negative.")
+
+
 def run_analysis(ollama_client, title, description):
     if not description:
-        raise ValueError("Description is required for sentiment analysis")
+        raise MissingContentError("Description is required for sentiment analysis")
 
     # Start a chat session with Ollama
     prompt = (f"Analyze the sentiment of this news item:\n\nTitle: {title}\nDescription: {description}\n\n"
               "Is it positive, neutral, or negative? "
               "You must start your response with -1 for negative, 0 for neutral and 1 for positive, followed by an explanation. "
-              "Note that the analysis is done for the purpose of determining if the news article is likely "
-              "to cause distress to the reader so it's important to annotate anything possibly causing distress as negative. Make sure response always starts with -1, 0 or 1 before the explanation.")
+              f"{DISTRESS_NOTE} Make sure response always starts with -1, 0 or 1 before the explanation.")
 
     # Send the prompt to the model and retrieve the response
     response = ollama_client.generate(prompt, options={"temperature": 0.2})
@@ -56,52 +112,163 @@ def run_analysis(ollama_client, title, description):
     return sentiment, explanation
 
 
-def extract_with_custom_rules(raw_html):
-    soup = BeautifulSoup(raw_html, "html.parser")
-
-    # Get text within <p> tags
-    paragraphs = [p.get_text() for p in soup.find_all("p")]
-
-    # Optionally, get 'title' attribute from the first image, if present
-    image_title = ""
-    image = soup.find("img", title=True)
-    if image:
-        image_title = image["title"]
-
-    # Combine both
-    combined_text = " ".join(paragraphs) + \
-        (f" {image_title}" if image_title else "")
-    return combined_text if combined_text else soup.get_text()
+def run_batch_analysis(ollama_client, articles):
+    """
+    Classifies several (title, description) articles with a single prompt.
 
+    Returns {index: (sentiment, explanation)} for the articles whose result could be parsed.
+    """
+    listing = "\n\n".join(f"Article {i}:\nTitle: {title}\nDescription: {description}"
+                           for i, (title, description) in enumerate(articles, 1))
+    prompt = (f"Analyze the sentiment of each of these {len(articles)} news items:\n\n{listing}\n\n"
+              "Is each one positive, neutral, or negative? "
+              "Respond with exactly one line per article, in the form '<article number>: <sentiment> <explanation>', "
+              "where sentiment is -1 for negative, 0 for neutral and 1 for positive. "
+              f"{DISTRESS_NOTE} Do not write anything other than these lines.")
 
-def process_rss_item(item):
-    title = item.find('title').text if item.find(
-        'title') is not None else "No title"
-    description_raw = item.find('description').text if item.find(
-        'description') is not None else None
-    description = None
-    if description_raw:
-        description = extract_with_custom_rules(description_raw)
-
-    return title, description
+    response = ollama_client.generate(prompt, options={"temperature": 0.2})
+    return parse_sentiment_batch(response, len(articles))
 
 
-def analyze_sentiment(ollama_client, raw_storage_path, source, pubDate, title):
-    article_path = Path(raw_storage_path) / source / \
-        generate_filename(title, pubDate)
-    if not article_path.exists():
-        raise Exception(f"{article_path} does not exist")
+def run_label_analysis(ollama_client, articles):
+    """
+    Classifies (title, description) articles with the output constrained to one label each.
 
-    item = ET.parse(article_path)
-    title, description = process_rss_item(item)
-    sentiment, explanation = run_analysis(ollama_client, title, description)
+    Returns the sentiments in article order. No explanation is generated; see
+    explain_digest_items.
+    """
+    if not all(description for _, description in articles):
+        raise MissingContentError("Description is required for sentiment analysis")
 
-    return sentiment, explanation
+    if len(articles) == 1:
+        title, description = articles[0]
+        prompt = (f"Analyze the sentiment of this news item:\n\nTitle: {title}\nDescription: {description}\n\n"
+                  "Is it positive, neutral, or negative? "
+                  f"Answer -1 for negative, 0 for neutral and 1 for positive. {DISTRESS_NOTE}")
+    else:
+        listing = "\n\n".join(f"Article {i}:\nTitle: {title}\nDescription: {description}"
+                               for i, (title, description) in enumerate(articles, 1))
+        prompt = (f"Analyze the sentiment of each of these {len(articles)} news items:\n\n{listing}\n\n"
+                  "Is each one positive, neutral, or negative? "
+                  "Answer with one label per article, in article order: -1 for negative, 0 for neutral and 1 for positive. "
+                  f"{DISTRESS_NOTE}")
+
+    labels = ollama_client.generate_labels(prompt, SENTIMENT_LABELS, len(articles), options={"temperature": 0.2})
+    return [int(label) for label in labels]
+
+
+def run_explanation(ollama_client, title, description, sentiment):
+    """Explains an existing sentiment label, for results produced in fast mode."""
+    label = {-1: "negative", 0: "neutral", 1: "positive"}[sentiment]
+    prompt = (f"This news item was classified as {label}:\n\nTitle: {title}\nDescription: {description}\n\n"
+              f"In one or two sentences, explain why it is {label}. {DISTRESS_NOTE}")
+    return ollama_client.generate(prompt, options={"temperature": 0.2}).strip()
+
+
+def _analyze_one(ollama_client, row, fast):
+    if fast:
+        return run_label_analysis(ollama_client, [(row[3], row[4])])[0], None
+    return run_analysis(ollama_client, row[3], row[4])
+
+
+def _analyze_rows(ollama_client, rows, fast=False):
+    """
+    Classifies pending rows, packing them into one prompt when there is more than one.
+
+    Rows missing from the batched response (and rows without a description, which
+    can't be classified) go through run_analysis one at a time. Returns a list of
+    (row, outcome) where outcome is (sentiment, explanation) or the exception raised.
+    In fast mode the labels come from run_label_analysis and explanation is None.
+    """
+    outcomes = []
+    single = rows
+    batchable = [row for row in rows if row[4]]
+    if len(batchable) > 1:
+        try:
+            articles = [(row[3], row[4]) for row in batchable]
+            if fast:
+                parsed = {index: (sentiment, None)
+                          for index, sentiment in enumerate(run_label_analysis(ollama_client, articles))}
+            else:
+                parsed = run_batch_analysis(ollama_client, articles)
+        except Exception as e:
+            print(f'Batch of {len(batchable)} failed, retrying individually: {e}')
+            parsed = {}
+        outcomes = [(batchable[index], result) for index, result in parsed.items()]
+        single = [row for index, row in enumerate(batchable) if index not in parsed] + \
+            [row for row in rows if not row[4]]
 
+    for row in single:
+        try:
+            outcomes.append((row, _analyze_one(ollama_client, row, fast)))
+        except Exception as e:
+            outcomes.append((row, e))
+    return outcomes
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def _migrate_label_source(cursor):
+    """Adds sentiment.label_source to databases created before it existed."""
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(sentiment)')]
+    if 'label_source' not in columns:
+        cursor.execute('ALTER TABLE sentiment ADD COLUMN label_source TEXT')
+        cursor.execute("UPDATE sentiment SET label_source = 'llm'")
+
+
+def analyze_articles(ollama_client, raw_storage_path, db_path, concurrency=1, batch_size=1,
+                     use_cache=True, near_dup_distance=DEFAULT_MAX_DISTANCE, fast=False, preclassifier=None,
+                     retry_failed=False, commit_every=COMMIT_EVERY_ITEMS, commit_seconds=COMMIT_EVERY_SECONDS,
+                     max_seconds=None, max_items=None, fair=False, source_weights=None, throttle=None,
+                     item_queue=None):
+    """
+    Classifies every stored item that has no sentiment yet.
+
+    Up to `concurrency` generate calls run at once (the server needs matching parallel
+    slots: OLLAMA_NUM_PARALLEL for Ollama, -np for llama-server), each classifying up
+    to `batch_size` articles. Results are written back in batches as they complete,
+    in whatever order they finish, and committed every `commit_every` results or
+    `commit_seconds` seconds, so an interrupted run only loses the last few. Pending
+    rows are streamed from the database instead of being loaded all at once.
+
+    With `use_cache`, an item whose text is identical to, or within `near_dup_distance`
+    SimHash bits of, an already-scored item reuses that item's result without an LLM
+    call (see dedup). sentiment.label_source records where each result came from.
+
+    In `fast` mode the model only produces labels, under constrained decoding, and
+    explanations are left NULL for explain_digest_items to fill in.
+
+    A `preclassifier` (see preclassifier.Preclassifier) labels the articles it is
+    confident about without the LLM; their explanation is left NULL as well.
+
+    Articles are processed newest first. With `fair` (or `source_weights`, a
+    {source: weight} dict) sources take turns, each getting `weight` items per turn
+    (1 by default). No new work is started once `max_seconds` have passed (counted from
+    the call, so the text and cache backfills count too) or `max_items` articles were
+    taken; prompts already in flight are allowed to finish.
+
+    A `throttle` (see load_probe.Throttle) is consulted throughout the run and pauses,
+    slows down or stops the analysis while the machine is busy.
+
+    Failed articles are recorded in analysis_attempts (see analysis_attempts) and
+    skipped until their next attempt is due; `retry_failed` forgets all failures first.
+    Server errors don't count as attempts, and after MAX_CONSECUTIVE_SERVER_ERRORS of
+    them in a row the run stops, leaving the rest for the next run.
+
+    With an `item_queue` (streaming mode), the items RSSDownloader publishes on it are
+    classified as they arrive, until it yields None; then the rest of the backlog is
+    processed as usual. Results are committed right away so downloads aren't blocked
+    on the database, and the fetch-to-classified latency of streamed items is reported.
+    """
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    concurrency = max(1, concurrency)
+    batch_size = max(1, batch_size)
 
-def analyze_articles(ollama_client, raw_storage_path, db_path):
     # Connect to the SQLite database
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, timeout=DB_LOCK_TIMEOUT)
     cursor = conn.cursor()
 
     # Create the sentiment table if it doesn't exist
@@ -112,38 +279,299 @@ def analyze_articles(ollama_client, raw_storage_path, db_path):
             title TEXT,
             sentiment INTEGER,  -- 0, 1, or 2
             explanation TEXT,
+            label_source TEXT,  -- llm, cache, near_dup or preclassifier
             PRIMARY KEY (source, pubDate, title)
         )
     ''')
+    _migrate_label_source(cursor)
+    conn.commit()
+    migrate_pub_ts(conn)  # pending items are ordered by pub_ts, which older databases lack
+
+    init_analysis_attempts_table(conn)
+    if retry_failed:
+        cursor.execute('DELETE FROM analysis_attempts')
+
+    # Items stored before item_text existed get their text extracted once
+    backfilled = backfill_item_text(conn, raw_storage_path)
+    if backfilled:
+        print(f"Extracted text for {backfilled} previously stored item(s)")
+
+    cache = SentimentCache(conn, near_dup_distance) if use_cache else None
+
+    # Newest first; with fairness, sources take turns, a source of weight W getting W items per turn
+    cursor.execute('CREATE TEMP TABLE IF NOT EXISTS source_weights (source TEXT PRIMARY KEY, weight REAL)')
+    cursor.execute('DELETE FROM source_weights')
+    cursor.executemany('INSERT INTO source_weights VALUES (?, ?)', (source_weights or {}).items())
+    conn.commit()  # don't keep a transaction open while reading, it would block concurrent downloads
+    order = '''(ROW_NUMBER() OVER (PARTITION BY r.source ORDER BY r.pub_ts DESC) - 1)
+            / COALESCE(w.weight, 1.0), r.pub_ts DESC''' if fair or source_weights else 'r.pub_ts DESC'
+
+    fetched = {}  # key -> fetched_at of the items received from item_queue
+    latencies = []
+
+    def queue_rows():
+        """Yields pending rows for the keys received from item_queue, or _WAITING while none is available."""
+        while True:
+            try:
+                entry = item_queue.get(timeout=QUEUE_POLL_SECONDS)
+            except queue.Empty:
+                yield _WAITING
+                continue
+            if entry is None:
+                return
+
+            key, fetched_at = entry
+            row = conn.execute('''
+                SELECT t.source, t.pubDate, t.title, t.clean_title, t.description, t.content_hash
+                FROM item_text t
+                LEFT JOIN sentiment s
+                ON t.source = s.source AND t.pubDate = s.pubDate AND t.title = s.title
+                WHERE t.source = ? AND t.pubDate = ? AND t.title = ? AND s.source IS NULL
+            ''', key).fetchone()
+            if row:
+                fetched[key] = fetched_at
+                yield row
+
+    def stream_rows():
+        # Find rss_items that do NOT have a matching entry in sentiment, and aren't backing off after a failure
+        cursor.execute(f'''
+            SELECT r.source, r.pubDate, r.title, t.clean_title, t.description, t.content_hash
+            FROM rss_items r
+            JOIN item_text t
+            ON r.source = t.source AND r.pubDate = t.pubDate AND r.title = t.title
+            LEFT JOIN sentiment s
+            ON r.source = s.source AND r.pubDate = s.pubDate AND r.title = s.title
+            LEFT JOIN analysis_attempts a
+            ON r.source = a.source AND r.pubDate = a.pubDate AND r.title = a.title
+            LEFT JOIN source_weights w
+            ON r.source = w.source
+            WHERE s.source IS NULL
+                AND (a.source IS NULL OR (a.state = 'retry' AND a.next_eligible_ts <= :now))
+            ORDER BY {order}
+        ''', {'now': int(time.time())})
+
+        while batch := cursor.fetchmany(FETCH_SIZE):
+            # Items that came through the queue may still be in flight
+            yield from (row for row in batch if row[:3] not in fetched)
+
+    uncommitted = 0
+    last_commit = time.monotonic()
+
+    def write_results(results, checkpoint=False):
+        """Writes queued results and failures, committing when a checkpoint is due."""
+        nonlocal uncommitted, last_commit
+        conn.executemany('''
+            INSERT INTO sentiment (source, pubDate, title, sentiment, explanation, label_source)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', results)
+        clear_attempts(conn, [result[:3] for result in results])
+        record_failures(conn, failures)
+        uncommitted += len(results) + len(failures)
+        results.clear()
+        failures.clear()
+
+        if checkpoint or uncommitted >= commit_every or time.monotonic() - last_commit >= commit_seconds:
+            conn.commit()
+            uncommitted = 0
+            last_commit = time.monotonic()
+
+    # While streaming, commit every result so concurrent downloads aren't kept waiting on the write lock
+    write_batch_size = 1 if item_queue is not None else WRITE_BATCH_SIZE
+    if item_queue is not None:
+        commit_every = 1
+
+    results = []
+    failures = []
+    rows = chain(queue_rows(), stream_rows()) if item_queue is not None else stream_rows()
+    taken = 0
+    out_of_budget = False
+    exhausted = False
+    server_errors = 0  # consecutive
+    server_down = False
+
+    def record(key, sentiment, explanation, label_source, content_hash=None):
+        """Queues a result, and the same result for the articles that waited on it in the cache."""
+        source, pubDate, title = key
+        results.append((source, pubDate, title, sentiment, explanation, label_source))
+        if key in fetched:
+            latencies.append(time.monotonic() - fetched[key])
+        if label_source == 'llm':
+            verb = "Processed"
+        elif label_source == 'preclassifier':
+            verb = "Labeled (preclassifier)"
+        else:
+            verb = f"Reused ({label_source})"
+        print(f"{verb}: source='{source}', pubDate='{pubDate}', title='{title}' → sentiment={sentiment}")
+
+        if cache and content_hash is not None:
+            for follower, follower_source in cache.resolve(content_hash, (sentiment, explanation)):
+                record(follower, sentiment, explanation, follower_source)
+
+    def next_batch():
+        """Returns up to batch_size rows that need the LLM, resolving cache and pre-classifier hits on the way."""
+        nonlocal taken, out_of_budget, exhausted
+        batch = []
+        while True:
+            if (max_items and taken >= max_items) or (deadline and time.monotonic() >= deadline):
+                out_of_budget = exhausted = True
+                break
+            row = next(rows, None)
+            if row is None:
+                exhausted = True
+                break
+            if row is _WAITING:
+                break  # send what we have rather than wait for the downloads
+            taken += 1
+            source, pubDate, title, clean_title, description, content_hash = row
+            cached = cache.lookup((source, pubDate, title), content_hash, clean_title, description) \
+                if cache else None
+            if cached is None:
+                sentiment = preclassifier.classify(clean_title, description) \
+                    if preclassifier and description else None
+                if sentiment is not None:
+                    record((source, pubDate, title), sentiment, None, 'preclassifier', content_hash)
+                    continue
+                batch.append(row)
+                if len(batch) == batch_size:
+                    break
+            elif cached != FOLLOWING:
+                sentiment, explanation, label_source = cached
+                record((source, pubDate, title), sentiment, explanation, label_source)
+        return batch
+
+    try:
+        # Keep up to `concurrency` prompts in flight; the LLM server decodes them in parallel
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            in_flight = set()
+            # Wake up regularly to sample the load, or to pick up newly downloaded items
+            poll = throttle.interval if throttle else QUEUE_POLL_SECONDS if item_queue is not None else None
+            while True:
+                # The throttle lowers the limit (to 0 when paused) while the machine is busy
+                limit = throttle.allowed_concurrency(concurrency) if throttle else concurrency
+                while not exhausted and len(in_flight) < limit:
+                    batch = next_batch()
+                    if not batch:
+                        break
+                    in_flight.add(executor.submit(_analyze_rows, ollama_client, batch, fast))
+                if not in_flight:
+                    if exhausted or (throttle and throttle.stopped):
+                        break
+                    if deadline and time.monotonic() >= deadline:
+                        out_of_budget = True
+                        break
+                    if limit == 0:
+                        # Paused: checkpoint what's been classified so far, the pause may last a while
+                        write_results(results, checkpoint=True)
+                        time.sleep(throttle.interval)
+                    continue
+
+                done, in_flight = wait(in_flight, timeout=poll, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for (source, pubDate, title, _, _, content_hash), outcome in future.result():
+                        if isinstance(outcome, Exception):
+                            if cache:
+                                cache.resolve(content_hash, None)
+                            print(f'Error processing {source}, {pubDate}, {title}: {outcome}')
+                            failures.append(((source, pubDate, title), outcome))
+                            if not is_article_error(outcome):
+                                server_errors += 1
+                                if server_errors >= MAX_CONSECUTIVE_SERVER_ERRORS and not server_down:
+                                    server_down = exhausted = True  # let what's in flight finish
+                            continue
+                        server_errors = 0
+                        sentiment, explanation = outcome
+                        record((source, pubDate, title), sentiment, explanation, 'llm', content_hash)
+
+                if len(results) >= write_batch_size or time.monotonic() - last_commit >= commit_seconds:
+                    write_results(results)
+    finally:
+        # Checkpoint what was classified, even if the run is interrupted
+        write_results(results, checkpoint=True)
+        cursor.close()  # releases the pending query's read lock
+
+    if out_of_budget:
+        print(f"Budget reached after {taken} item(s); the rest is left for the next run")
+    if server_down:
+        print(f"Stopped after {MAX_CONSECUTIVE_SERVER_ERRORS} server errors in a row; "
+              "the rest is left for the next run")
+    if throttle:
+        throttle.finish()
+        if throttle.stopped:
+            print(f"Stopped after {taken} item(s) because of load; the rest is left for the next run")
+        print(f"Throttle: {throttle.summary()}")
+    if latencies:
+        print(f"Fetch-to-classified latency of {len(latencies)} streamed item(s): "
+              f"p50 {_percentile(latencies, 50):.1f}s, p95 {_percentile(latencies, 95):.1f}s")
+    if cache:
+        print(f"Sentiment cache: {cache.summary()}")
+    if preclassifier:
+        print(f"Pre-classifier: {preclassifier.summary()}")
+    print(f"Failures: {attempts_summary(conn)}")
+
+    conn.close()
+
+
+def load_source_weights(feeds_file):
+    """Returns {source: weight} for the feeds of a download_feeds YAML file that set a weight."""
+    import yaml
+    with open(feeds_file) as f:
+        feeds = yaml.safe_load(f)
+    return {feed["name"]: float(feed["weight"]) for feed in feeds if "weight" in feed}
 
-    # Find rss_items that do NOT have a matching entry in sentiment
-    cursor.execute('''
-        SELECT r.source, r.pubDate, r.title
-        FROM rss_items r
-        LEFT JOIN sentiment s
-        ON r.source = s.source AND r.pubDate = s.pubDate AND r.title = s.title
-        WHERE s.source IS NULL
-    ''')
 
-    rows_to_process = cursor.fetchall()
+def explain_digest_items(ollama_client, db_path, concurrency=1, max_seconds=None):
+    """
+    Generates the explanations skipped in fast mode, only for the items the next digest will contain.
 
-    for source, pubDate, title in rows_to_process:
+    No new explanation is started once `max_seconds` have passed; the rest are left for
+    the next run.
+    """
+    deadline = time.monotonic() + max_seconds if max_seconds is not None else None
+    if deadline is not None and max_seconds <= 0:
+        print("No time left to explain digest items")
+        return
+
+    from send_digest import fetch_digest_items, init_sent_items_table
+
+    conn = sqlite3.connect(db_path)
+    init_sent_items_table(conn)
+    migrate_pub_ts(conn)
+
+    pending = []
+    for _, source, pubDate, title, _ in fetch_digest_items(conn):
+        row = conn.execute('''
+            SELECT t.clean_title, t.description, s.sentiment
+            FROM sentiment s
+            JOIN item_text t
+            ON s.source = t.source AND s.pubDate = t.pubDate AND s.title = t.title
+            WHERE s.source = ? AND s.pubDate = ? AND s.title = ? AND s.explanation IS NULL
+        ''', (source, pubDate, title)).fetchone()
+        if row:
+            pending.append(((source, pubDate, title), row))
+
+    def explain(item):
+        key, (clean_title, description, sentiment) = item
+        if deadline is not None and time.monotonic() >= deadline:
+            return key, None
         try:
-            sentiment, explanation = analyze_sentiment(
-                ollama_client, raw_storage_path, source, pubDate, title)
-
-            cursor.execute('''
-                INSERT INTO sentiment (source, pubDate, title, sentiment, explanation)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (source, pubDate, title, sentiment, explanation))
-            print(
-                f"Processed: source='{source}', pubDate='{pubDate}', title='{title}' → sentiment={sentiment}")
+            return key, run_explanation(ollama_client, clean_title, description, sentiment)
         except Exception as e:
-            print(f'Error processing {source}, {pubDate}, {title}: {e}')
+            print(f'Error explaining {key}: {e}')
+            return key, None
 
-    # Commit changes and close the connection
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        explained = [(explanation, *key) for key, explanation in executor.map(explain, pending)
+                     if explanation]
+
+    conn.executemany('''
+        UPDATE sentiment SET explanation = ?
+        WHERE source = ? AND pubDate = ? AND title = ?
+    ''', explained)
     conn.commit()
     conn.close()
+    out_of_time = deadline is not None and time.monotonic() >= deadline
+    print(f"Explained {len(explained)}/{len(pending)} digest item(s)"
+          f"{'; out of time, the rest are left for the next run' if out_of_time else ''}")
 
 
 import argparse
@@ -151,6 +579,8 @@ import sys
 from pathlib import Path
 
 def main(args):
+    from llm_wrapper import DEFAULT_TIMEOUT
+
     # Set up argument parser
     parser = argparse.ArgumentParser(
         description="Analyze RSS articles using a local LLM runtime."
@@ -177,6 +607,90 @@ def main(args):
         default=Path("rss_storage.sqlite"),
         help="Path to the SQLite database file (default: rss_storage.sqlite)."
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of prompts sent in parallel (default: 1)."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Number of articles classified per prompt; 1 sends each article on its own (default: 1)."
+    )
+    parser.add_argument(
+        "--llm-timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f"Seconds allowed for a single LLM request (default: {DEFAULT_TIMEOUT})."
+    )
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="Only generate sentiment labels, with constrained output; explanations are then "
+             "generated for the items the next digest will contain."
+    )
+    parser.add_argument(
+        "--preclassifier",
+        type=Path,
+        help="Trained pre-classifier model (see preclassifier.py); articles it labels confidently skip the LLM."
+    )
+    parser.add_argument(
+        "--preclassifier-threshold",
+        type=float,
+        default=0.95,
+        help="Minimum pre-classifier confidence for an article to skip the LLM (default: 0.95)."
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        help="Stop starting new work after this many seconds (default: no limit)."
+    )
+    parser.add_argument(
+        "--max-items",
+        type=int,
+        help="Process at most this many articles (default: no limit)."
+    )
+    parser.add_argument(
+        "--fair",
+        action="store_true",
+        help="Let sources take turns instead of processing strictly newest first."
+    )
+    parser.add_argument(
+        "--feeds-file",
+        type=Path,
+        help="download_feeds YAML file; feeds with a 'weight' get that many items per turn (implies --fair)."
+    )
+    parser.add_argument(
+        "--commit-every",
+        type=int,
+        default=COMMIT_EVERY_ITEMS,
+        help=f"Commit after this many results (default: {COMMIT_EVERY_ITEMS})."
+    )
+    parser.add_argument(
+        "--commit-seconds",
+        type=float,
+        default=COMMIT_EVERY_SECONDS,
+        help=f"Commit at least this often while results come in, in seconds (default: {COMMIT_EVERY_SECONDS})."
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Retry every article that failed before, including those given up on."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Send every article to the LLM, even if an identical or near-identical one was already scored."
+    )
+    parser.add_argument(
+        "--near-dup-distance",
+        type=int,
+        default=DEFAULT_MAX_DISTANCE,
+        help=f"Maximum SimHash distance in bits (0-{MAX_DISTANCE}) for an article to count as a near-duplicate; "
+             f"0 only reuses results of identical articles (default: {DEFAULT_MAX_DISTANCE})."
+    )
 
     # Parse the arguments
     parsed_args = parser.parse_args(args)
@@ -190,16 +704,36 @@ def main(args):
         print(f"{parsed_args.db_path} does not exist")
         sys.exit(1)
 
+    preclassifier = None
+    if parsed_args.preclassifier:
+        from preclassifier import Preclassifier
+        preclassifier = Preclassifier.load(parsed_args.preclassifier, parsed_args.preclassifier_threshold)
+
     # Initialize the requested client wrapper
     if parsed_args.runtime == "ollama":
-        llm_client = OllamaWrapper(MODEL_NAME)
+        from ollama_wrapper import OllamaWrapper
+        llm_client = OllamaWrapper(MODEL_NAME, num_parallel=parsed_args.concurrency,
+                                   timeout=parsed_args.llm_timeout)
     else:
-        llm_client = LlamaCppWrapper()
+        from llama_cpp_wrapper import LlamaCppWrapper
+        llm_client = LlamaCppWrapper(parallel=parsed_args.concurrency, timeout=parsed_args.llm_timeout)
 
     # Execute analysis with lifecycle management
     try:
         llm_client.start()
-        analyze_articles(llm_client, parsed_args.raw_storage_path, parsed_args.db_path)
+        started = time.monotonic()
+        analyze_articles(llm_client, parsed_args.raw_storage_path, parsed_args.db_path,
+                         concurrency=parsed_args.concurrency, batch_size=parsed_args.batch_size,
+                         use_cache=not parsed_args.no_cache, near_dup_distance=parsed_args.near_dup_distance,
+                         fast=parsed_args.fast, preclassifier=preclassifier,
+                         retry_failed=parsed_args.retry_failed, commit_every=parsed_args.commit_every,
+                         commit_seconds=parsed_args.commit_seconds, max_seconds=parsed_args.max_seconds,
+                         max_items=parsed_args.max_items, fair=parsed_args.fair or parsed_args.feeds_file is not None,
+                         source_weights=load_source_weights(parsed_args.feeds_file) if parsed_args.feeds_file else None)
+        if parsed_args.fast or preclassifier:
+            remaining = parsed_args.max_seconds - (time.monotonic() - started) if parsed_args.max_seconds else None
+            explain_digest_items(llm_client, parsed_args.db_path, concurrency=parsed_args.concurrency,
+                                 max_seconds=remaining)
     finally:
         llm_client.stop()
 
@@ -0,0 +1,84 @@
+"""
+Micro-benchmark for utils.parse_pub_date against plain dateparser.
+
+Generates a set of realistic pubDate strings, checks that generate_filename gives
+byte-identical names with both parsers, then times:
+  - dateparser.parse on every string
+  - the fast path with the LRU cache bypassed
+  - the cached path (every item parsed twice, as download + analysis do)
+
+Usage:
+    python benchmarks/bench_dates.py [--count N]
+"""
+
+import argparse
+import hashlib
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import dateparser
+
+from utils import generate_filename, parse_pub_date
+
+_FORMATS = [
+    lambda d: d.strftime('%a, %d %b %Y %H:%M:%S +0000'),
+    lambda d: d.strftime('%a, %d %b %Y %H:%M:%S GMT'),
+    lambda d: d.astimezone(timezone(timedelta(hours=-5))).strftime('%a, %d %b %Y %H:%M:%S -0500'),
+    lambda d: d.strftime('%d %b %Y %H:%M:%S EST'),
+    lambda d: d.strftime('%Y-%m-%dT%H:%M:%SZ'),
+    lambda d: d.astimezone(timezone(timedelta(hours=2))).isoformat(),
+    lambda d: d.strftime('%B %d, %Y %H:%M'),  # unusual: goes through dateparser
+]
+
+
+def _sample_dates(count):
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [_FORMATS[i % len(_FORMATS)](start + timedelta(seconds=rng.randrange(60 * 86400)))
+            for i in range(count)]
+
+
+def _legacy_filename(title, pubDate):
+    sanitized_timestamp = dateparser.parse(pubDate).strftime("%Y_%m_%d_%H_%M_%S")
+    return f"{sanitized_timestamp}_{hashlib.md5(title.encode()).hexdigest()}.xml"
+
+
+def _time(label, fn, dates, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for pubDate in dates:
+            fn(pubDate)
+    elapsed = time.perf_counter() - start
+    calls = len(dates) * repeat
+    print(f"{label:<28} {calls:>7} calls  {elapsed:8.3f}s  {elapsed / calls * 1e6:9.1f} us/call")
+    return elapsed
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Benchmark pubDate parsing.")
+    parser.add_argument('--count', type=int, default=2000, help='Number of pubDate strings (default: 2000)')
+    parsed = parser.parse_args(args)
+
+    dates = _sample_dates(parsed.count)
+
+    mismatches = [d for d in dates if generate_filename("title", d) != _legacy_filename("title", d)]
+    if mismatches:
+        print(f"Filename mismatch for {len(mismatches)} dates, e.g. {mismatches[0]!r}")
+        sys.exit(1)
+    print(f"Filenames identical for all {len(dates)} dates.")
+
+    parse_pub_date.cache_clear()
+    slow = _time("dateparser.parse", dateparser.parse, dates)
+    fast = _time("parse_pub_date (uncached)", parse_pub_date.__wrapped__, dates)
+    parse_pub_date.cache_clear()
+    cached = _time("parse_pub_date (cached x2)", parse_pub_date, dates, repeat=2)
+    print(f"Speedup: {slow / fast:.1f}x uncached, {2 * slow / cached:.1f}x cached")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,199 @@
+"""
+End-to-end pipeline benchmark with local stand-ins (see benchmarks/fakes.py): no live
+feeds, GPU or Gmail account needed.
+
+Runs, against a fresh database:
+  - download: RSSDownloader.download_items for every synthetic feed (latency per feed)
+  - analyze:  analyze_articles with a wrapper pointed at the fake LLM server (latency per LLM call)
+  - digest:   send_digest with a fake Gmail service (latency per email)
+
+and prints, per stage, items/sec, p50/p95 latency and peak RSS as JSON. Pipeline
+output goes to stderr.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--feeds N] [--items N] [--description-size N]
+        [--runtime {ollama,llama_cpp}] [--llm-latency SECS] [--concurrency N] [--batch-size N]
+        [--output PATH]
+"""
+
+import argparse
+import json
+import platform
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import psutil
+
+from analyze_articles import analyze_articles
+from fakes import FakeGmailService, FakeLLMServer, FeedServer
+from llama_cpp_wrapper import LlamaCppWrapper
+from ollama_wrapper import OllamaWrapper
+from rss_downloader import RSSDownloader
+from send_digest import init_sent_items_table, send_digest
+from utils import migrate_pub_ts
+
+
+def make_client(runtime, url, timeout, latencies):
+    """Returns a wrapper for the fake server at `url` that appends every generate call's duration to `latencies`."""
+    if runtime == 'ollama':
+        return OllamaWrapper('bench-model', timeout=timeout, url=url, on_call=latencies.append)
+    return LlamaCppWrapper(timeout=timeout, url=url, on_call=latencies.append)
+
+
+class PeakRss:
+    """Tracks the peak RSS of this process while the block runs, sampling from a thread."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._process = psutil.Process()
+        self._done = threading.Event()
+
+    def _sample(self):
+        self.peak = max(self.peak, self._process.memory_info().rss)
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        self._sample()
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def stage_result(items, seconds, latencies, unit, peak_rss):
+    return {
+        'items': items,
+        'seconds': round(seconds, 3),
+        'items_per_sec': round(items / seconds, 1) if seconds else None,
+        'latency_unit': unit,
+        'latency_count': len(latencies),
+        'latency_p50_ms': round(1000 * _percentile(latencies, 50), 1) if latencies else None,
+        'latency_p95_ms': round(1000 * _percentile(latencies, 95), 1) if latencies else None,
+        'peak_rss_mb': round(peak_rss / 2 ** 20, 1),
+    }
+
+
+def _count(db_path, table):
+    conn = sqlite3.connect(db_path)
+    count = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    conn.close()
+    return count
+
+
+def bench_download(feeds, db_path, raw_path, workers):
+    def run(feed):
+        started = time.perf_counter()
+        RSSDownloader(feed['name'], feed['url'], str(db_path), str(raw_path)).download_items()
+        return time.perf_counter() - started
+
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            latencies = list(executor.map(run, feeds))
+        seconds = time.perf_counter() - started
+    return stage_result(_count(db_path, 'rss_items'), seconds, latencies, 'feed', rss.peak)
+
+
+def bench_analyze(client, latencies, db_path, raw_path, concurrency, batch_size, fast, use_cache):
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        client.start()
+        try:
+            analyze_articles(client, str(raw_path), str(db_path), concurrency=concurrency,
+                             batch_size=batch_size, fast=fast, use_cache=use_cache)
+        finally:
+            client.stop()
+        seconds = time.perf_counter() - started
+    return stage_result(_count(db_path, 'sentiment'), seconds, latencies, 'llm call', rss.peak)
+
+
+def bench_digest(db_path, service):
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        conn = sqlite3.connect(db_path)
+        init_sent_items_table(conn)
+        migrate_pub_ts(conn)
+        sent = send_digest(conn, 'bench@example.com', service=service)
+        conn.close()
+        seconds = time.perf_counter() - started
+    return stage_result(sent, seconds, service.latencies, 'email', rss.peak)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Benchmark download, analysis and digest against local stand-ins.")
+    parser.add_argument('--feeds', type=int, default=20, help='Synthetic feeds (default: 20)')
+    parser.add_argument('--items', type=int, default=50, help='Items per feed (default: 50)')
+    parser.add_argument('--description-size', type=int, default=400,
+                        help='Characters per item description (default: 400)')
+    parser.add_argument('--download-workers', type=int, default=8, help='Feeds downloaded at once (default: 8)')
+    parser.add_argument('--runtime', choices=['ollama', 'llama_cpp'], default='ollama',
+                        help='Which wrapper and fake endpoints to use (default: ollama)')
+    parser.add_argument('--llm-latency', type=float, default=0.05,
+                        help='Seconds the fake LLM takes per request (default: 0.05)')
+    parser.add_argument('--llm-jitter', type=float, default=0.0,
+                        help='Random +/- variation of the LLM latency in seconds (default: 0)')
+    parser.add_argument('--llm-slots', type=int,
+                        help='Requests the fake LLM processes at once (default: unlimited)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Analysis prompts in flight (default: 4)')
+    parser.add_argument('--batch-size', type=int, default=1, help='Articles per prompt (default: 1)')
+    parser.add_argument('--fast', action='store_true', help='Label-only analysis')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the sentiment cache')
+    parser.add_argument('--gmail-latency', type=float, default=0.02,
+                        help='Seconds the fake Gmail API takes per email (default: 0.02)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic content (default: 0)')
+    parser.add_argument('--output', type=Path, help='Write the JSON report here instead of stdout')
+    parsed = parser.parse_args(args)
+
+    report = {
+        'config': {name: str(value) if isinstance(value, Path) else value for name, value in vars(parsed).items()},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': psutil.cpu_count()},
+        'stages': {},
+    }
+
+    with tempfile.TemporaryDirectory() as work_dir, redirect_stdout(sys.stderr), \
+            FeedServer(parsed.feeds, parsed.items, parsed.description_size, parsed.seed) as feed_server, \
+            FakeLLMServer(parsed.llm_latency, parsed.llm_jitter, parsed.llm_slots, parsed.seed) as llm_server:
+        db_path = Path(work_dir) / 'bench.sqlite'
+        raw_path = Path(work_dir) / 'raw'
+
+        report['stages']['download'] = bench_download(feed_server.feed_list(), db_path, raw_path,
+                                                      parsed.download_workers)
+
+        latencies = []
+        client = make_client(parsed.runtime, llm_server.url, 60, latencies)
+        report['stages']['analyze'] = bench_analyze(client, latencies, db_path, raw_path, parsed.concurrency,
+                                                    parsed.batch_size, parsed.fast, not parsed.no_cache)
+
+        report['stages']['digest'] = bench_digest(db_path, FakeGmailService(parsed.gmail_latency))
+
+    output = json.dumps(report, indent=2)
+    if parsed.output:
+        parsed.output.write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,211 @@
+"""
+Local stand-ins for the pipeline's external services, for benchmarks/bench_pipeline.py.
+
+- FeedServer: serves synthetic RSS feeds (make_feed) over HTTP on 127.0.0.1.
+- FakeLLMServer: answers the Ollama (/api/tags, /api/generate) and OpenAI-compatible
+  (/health, /v1/chat/completions) endpoints used by the wrappers, after a tunable
+  latency, with at most `slots` requests processed at once like a real server.
+  Sentiments are derived from a hash of the prompt, so runs are reproducible.
+- FakeGmailService: the part of the Gmail API service mailer.send_email uses.
+
+Servers run in a background thread; use them as context managers.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+_WORDS = ("council", "river", "festival", "school", "storm", "market", "garden", "team", "bridge",
+          "library", "museum", "volunteers", "rescue", "record", "harvest", "concert", "delay",
+          "award", "community", "hospital", "park", "election", "recovery", "launch", "discovery")
+
+
+def make_feed(feed_index, items, description_size, seed=0, now=None):
+    """Returns the bytes of an RSS 2.0 feed of `items` items, one per minute back from `now`."""
+    rng = random.Random(f"{seed}-{feed_index}")
+    now = (now or datetime.now(timezone.utc)).replace(second=0, microsecond=0)
+    entries = []
+    for i in range(items):
+        title = " ".join(rng.choice(_WORDS) for _ in range(6)).capitalize() + f" ({feed_index}-{i})"
+        words = []
+        while sum(len(word) + 1 for word in words) < description_size:
+            words.append(rng.choice(_WORDS))
+        description = f"<p>{' '.join(words)}</p>"
+        entries.append(f"""
+    <item>
+      <title>{escape(title)}</title>
+      <link>https://example.com/{feed_index}/{i}</link>
+      <description>{escape(description)}</description>
+      <pubDate>{format_datetime(now - timedelta(minutes=i), usegmt=True)}</pubDate>
+    </item>""")
+    return (f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0">
+  <channel>
+    <title>Feed {feed_index}</title>
+    <link>https://example.com/{feed_index}</link>
+    <description>Synthetic feed</description>{''.join(entries)}
+  </channel>
+</rss>
+""").encode()
+
+
+class _Server:
+    def __init__(self, handler):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.fake = self
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real servers
+    disable_nagle_algorithm = True  # headers and body are written separately
+
+    def _reply(self, code, body, content_type='application/json'):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        return json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _FeedHandler(_Handler):
+    def do_GET(self):
+        feed = self.server.fake.feeds.get(self.path)
+        if feed is None:
+            self._reply(404, {'error': 'not found'})
+        else:
+            self._reply(200, feed, 'application/rss+xml')
+
+
+class FeedServer(_Server):
+    def __init__(self, feeds, items, description_size, seed=0):
+        super().__init__(_FeedHandler)
+        now = datetime.now(timezone.utc)
+        self.feeds = {f"/feed/{i}.xml": make_feed(i, items, description_size, seed, now) for i in range(feeds)}
+
+    def feed_list(self):
+        """Returns the feeds in the format of a download_feeds YAML file."""
+        return [{'name': f"feed{path.split('/')[-1][:-4]}", 'url': self.url + path} for path in self.feeds]
+
+
+def _sentiment(text):
+    return zlib.crc32(text.encode()) % 3 - 1
+
+
+class _LLMHandler(_Handler):
+    def do_GET(self):
+        if self.path in ('/', '/api/tags'):
+            self._reply(200, {'models': []})
+        elif self.path == '/health':
+            self._reply(200, {'status': 'ok'})
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        fake = self.server.fake
+        body = self._read_json()
+        if self.path == '/api/generate':
+            text = fake.answer(body.get('prompt', ''), body.get('format'))
+            self._reply(200, {'model': body.get('model'), 'created_at': datetime.now(timezone.utc).isoformat(),
+                              'response': text, 'done': True})
+        elif self.path == '/v1/chat/completions':
+            text = fake.answer(body['messages'][-1]['content'], grammar=body.get('grammar'))
+            self._reply(200, {'id': 'bench', 'object': 'chat.completion', 'created': int(time.time()),
+                              'model': body.get('model'),
+                              'choices': [{'index': 0, 'finish_reason': 'stop',
+                                           'message': {'role': 'assistant', 'content': text}}]})
+        else:
+            self._reply(404, {'error': 'not found'})
+
+
+class FakeLLMServer(_Server):
+    def __init__(self, latency=0.05, jitter=0.0, slots=None, seed=0):
+        super().__init__(_LLMHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._slots = threading.Semaphore(slots) if slots else None
+
+    def _delay(self):
+        with self._rng_lock:
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+        if self._slots:
+            with self._slots:
+                time.sleep(delay)
+        else:
+            time.sleep(delay)
+
+    def answer(self, prompt, schema=None, grammar=None):
+        """Returns the model output for the prompt, after the configured latency."""
+        if not prompt or prompt == "Hi":
+            return ""  # warm-up
+        self._delay()
+
+        if schema or grammar:
+            # Label-only output: the JSON schema (Ollama) or grammar (llama-server) gives the count
+            count = schema['properties']['labels']['minItems'] if schema else \
+                grammar.splitlines()[0].count('label')
+            labels = [str(_sentiment(f"{prompt}-{i}")) for i in range(count)]
+            return json.dumps({'labels': labels}) if schema else ",".join(labels)
+
+        batch = re.search(r'each of these (\d+) news items', prompt)
+        if batch:
+            return "\n".join(f"{i}: {_sentiment(f'{prompt}-{i}')} Synthetic explanation."
+                             for i in range(1, int(batch.group(1)) + 1))
+        if prompt.startswith("This news item was classified"):
+            return "Synthetic explanation."
+        return f"{_sentiment(prompt)} Synthetic explanation."
+
+
+class FakeGmailService:
+    """Records the messages mailer.send_email sends, after `latency` seconds each."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.sent = []
+        self.latencies = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def send(self, userId, body):
+        return _FakeSendRequest(self, body)
+
+
+class _FakeSendRequest:
+    def __init__(self, service, body):
+        self.service = service
+        self.body = body
+
+    def execute(self):
+        started = time.perf_counter()
+        time.sleep(self.service.latency)
+        self.service.sent.append(self.body)
+        self.service.latencies.append(time.perf_counter() - started)
+        return {'id': str(len(self.service.sent))}
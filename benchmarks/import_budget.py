@@ -0,0 +1,124 @@
+"""
+Import-time budget check for the entry points.
+
+Each entry point is imported in a fresh interpreter with `python -X importtime`
+(best of --repeat runs). The check fails if its cumulative import time exceeds its
+budget, or if it pulls in a dependency that should only be loaded once the stage that
+needs it runs (LLM clients, Google libraries, bs4, psutil, Pillow, numpy, ...).
+
+Imports deferred into main() count too: each entry point's main(['--help']) is run in
+another fresh interpreter, and none of those dependencies may be loaded by the time
+its arguments are parsed.
+
+Usage:
+    python benchmarks/import_budget.py [--repeat N] [--scale X]
+
+Exits with status 1 if any entry point is over budget. --scale multiplies every
+budget, for slow machines.
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Deferred until a stage runs; no entry point should load them at import
+_ALWAYS_LAZY = ('bs4', 'dateparser', 'psutil', 'PIL', 'pystray', 'ollama', 'openai',
+                'googleapiclient', 'google.auth', 'google_auth_oauthlib', 'numpy')
+
+# entry point: (budget in ms, modules it must not import)
+BUDGETS = {
+    'run_pipeline': (60, _ALWAYS_LAZY + ('requests', 'yaml')),
+    'analyze_articles': (100, _ALWAYS_LAZY + ('requests',)),
+    'send_digest': (100, _ALWAYS_LAZY + ('requests',)),
+    'download_feeds': (300, _ALWAYS_LAZY),
+    'rss_downloader': (300, _ALWAYS_LAZY),
+    'preclassifier': (60, _ALWAYS_LAZY + ('requests',)),
+}
+
+# Runs main(['--help']) with its output discarded, then lists every loaded module
+_MAIN_SCRIPT = '''
+import contextlib, io, sys
+import {module}
+with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+    try:
+        {module}.main(['--help'])
+    except SystemExit:
+        pass
+print("\\n".join(sys.modules))
+'''
+
+_LINE = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def measure(module):
+    """Returns (cumulative import time in ms, set of modules imported) for a fresh import of `module`."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    total, imported = None, set()
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = match.groups()
+        imported.add(name)
+        if name == module and not indent:
+            total = int(cumulative) / 1000
+    return total, imported
+
+
+def loaded_by_main(module):
+    """Returns the set of modules loaded once `module`.main(['--help']) has parsed its arguments."""
+    result = subprocess.run([sys.executable, '-c', _MAIN_SCRIPT.format(module=module)],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{module}.main(['--help']) failed:\n{result.stderr[-2000:]}")
+    return set(result.stdout.split())
+
+
+def _matching(forbidden, imported):
+    return [lazy for lazy in forbidden
+            if any(name == lazy or name.startswith(lazy + '.') for name in imported)]
+
+
+def check(module, forbidden, repeat):
+    timings = []
+    for _ in range(repeat):
+        total, imported = measure(module)
+        timings.append(total)
+    best = min(timings)
+    return best, _matching(forbidden, imported), _matching(_ALWAYS_LAZY, loaded_by_main(module))
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Check the import time of each entry point against its budget.")
+    parser.add_argument('--repeat', type=int, default=5, help='Imports per entry point; the fastest counts (default: 5)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every budget by this (default: 1)')
+    parsed = parser.parse_args(args)
+
+    failed = False
+    print(f"{'entry point':<18} {'import':>9} {'budget':>9}  status")
+    for module, (budget, forbidden) in BUDGETS.items():
+        budget *= parsed.scale
+        best, loaded, loaded_by_parsing = check(module, forbidden, parsed.repeat)
+        problems = []
+        if best > budget:
+            problems.append("over budget")
+        if loaded:
+            problems.append(f"imports {', '.join(loaded)}")
+        if loaded_by_parsing:
+            problems.append(f"main() imports {', '.join(loaded_by_parsing)} before running")
+        failed |= bool(problems)
+        print(f"{module:<18} {best:>7.1f}ms {budget:>7.0f}ms  {'; '.join(problems) or 'ok'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,213 @@
+"""
+Reuse of sentiment results across identical and near-identical articles.
+
+The same wire story often appears in several feeds with small differences. Before an
+article is sent to the LLM, SentimentCache looks for an article, already scored or
+being classified in this run, with:
+
+1. the same item_text.content_hash (identical text after normalization), or
+2. a SimHash of its text within `max_distance` bits of the article's SimHash.
+
+SimHashes of scored articles are kept in the simhash_index table, split into eight
+8-bit bands. Two hashes that differ in at most 7 bits must agree on at least one
+band, so candidates are found with indexed band lookups and only those are compared.
+"""
+
+import hashlib
+import re
+
+DEFAULT_MAX_DISTANCE = 6
+_BANDS = 8
+_BAND_BITS = 8
+MAX_DISTANCE = _BANDS - 1  # beyond this, band lookups can miss matches
+_SHINGLE_SIZE = 2
+
+# Returned by SentimentCache.lookup when the article waits for one being classified
+FOLLOWING = 'following'
+
+
+def _tokens(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def simhash(text):
+    """Returns the 64-bit SimHash of the text's word bigrams, as a signed integer for SQLite."""
+    tokens = _tokens(text)
+    shingles = [' '.join(tokens[i:i + _SHINGLE_SIZE])
+                for i in range(max(1, len(tokens) - _SHINGLE_SIZE + 1))]
+
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    value = sum(1 << bit for bit in range(64) if weights[bit] > 0)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming_distance(a, b):
+    return bin((a ^ b) & ((1 << 64) - 1)).count('1')
+
+
+def _bands(value):
+    unsigned = value & ((1 << 64) - 1)
+    mask = (1 << _BAND_BITS) - 1
+    return [unsigned >> (i * _BAND_BITS) & mask for i in range(_BANDS)]
+
+
+def _text(clean_title, description):
+    return f"{clean_title} {description or ''}"
+
+
+class SentimentCache:
+    """
+    Finds earlier results an article can reuse, and counts how often that happens.
+
+    Articles that miss are registered as in flight; a later identical or near-identical
+    article in the same run waits for their result instead of being classified again.
+    """
+
+    def __init__(self, conn, max_distance=DEFAULT_MAX_DISTANCE):
+        self.conn = conn
+        self.max_distance = min(max_distance, MAX_DISTANCE)
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.lookups = 0
+        self._in_flight = {}  # content_hash -> (key, simhash, [(key, simhash, label_source)])
+        # Results from this run, which may not be written to the sentiment table yet
+        self._scored = {}     # content_hash -> (sentiment, explanation)
+        self._scored_simhashes = []  # [(simhash, (sentiment, explanation))]
+
+        band_columns = ''.join(f'band{band} INTEGER,\n' for band in range(_BANDS))
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS simhash_index (
+                source TEXT,
+                pubDate TEXT,
+                title TEXT,
+                simhash INTEGER,
+                {band_columns}
+                PRIMARY KEY (source, pubDate, title)
+            )
+        ''')
+        for band in range(_BANDS):
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_simhash_band{band} ON simhash_index (band{band})')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_item_text_content_hash ON item_text (content_hash)')
+        self._backfill()
+
+    def _backfill(self):
+        """Indexes articles scored before the simhash index existed."""
+        rows = self.conn.execute('''
+            SELECT s.source, s.pubDate, s.title, t.clean_title, t.description
+            FROM sentiment s
+            JOIN item_text t
+            ON s.source = t.source AND s.pubDate = t.pubDate AND s.title = t.title
+            LEFT JOIN simhash_index h
+            ON s.source = h.source AND s.pubDate = h.pubDate AND s.title = h.title
+            WHERE h.source IS NULL
+        ''').fetchall()
+        for source, pubDate, title, clean_title, description in rows:
+            self._index((source, pubDate, title), simhash(_text(clean_title, description)))
+        self.conn.commit()
+
+    def _index(self, key, value):
+        placeholders = ', '.join('?' * (4 + _BANDS))
+        self.conn.execute(f'INSERT OR REPLACE INTO simhash_index VALUES ({placeholders})',
+                          (*key, value, *_bands(value)))
+
+    def lookup(self, key, content_hash, clean_title, description):
+        """
+        Looks for a result the article with this (source, pubDate, title) key can reuse.
+
+        Returns (sentiment, explanation, label_source) if a matching article was already
+        scored, where label_source is 'cache' for an identical article and 'near_dup'
+        for a near-duplicate. Returns FOLLOWING if a matching article is still being
+        classified; the key is then handed back by resolve(). Otherwise the article is
+        registered as in flight and None is returned: the caller must classify it and
+        call resolve() with its content_hash.
+        """
+        self.lookups += 1
+        row = self._scored.get(content_hash) or self.conn.execute('''
+            SELECT s.sentiment, s.explanation
+            FROM item_text t
+            JOIN sentiment s
+            ON s.source = t.source AND s.pubDate = t.pubDate AND s.title = t.title
+            WHERE t.content_hash = ?
+            LIMIT 1
+        ''', (content_hash,)).fetchone()
+        if row:
+            self.exact_hits += 1
+            return row[0], row[1], 'cache'
+
+        value = simhash(_text(clean_title, description))
+        if content_hash in self._in_flight:
+            self._in_flight[content_hash][2].append((key, value, 'cache'))
+            return FOLLOWING
+
+        if self.max_distance > 0:
+            match = self._nearest_scored(value)
+            if match:
+                sentiment, explanation = match
+                self.near_hits += 1
+                self._index(key, value)
+                self._scored_simhashes.append((value, match))
+                return sentiment, explanation, 'near_dup'
+
+            for _, leader_value, followers in self._in_flight.values():
+                if hamming_distance(value, leader_value) <= self.max_distance:
+                    followers.append((key, value, 'near_dup'))
+                    return FOLLOWING
+
+        self._in_flight[content_hash] = (key, value, [])
+        return None
+
+    def _nearest_scored(self, value):
+        bands = _bands(value)
+        condition = ' OR '.join(f'h.band{band} = ?' for band in range(_BANDS))
+        candidates = self.conn.execute(f'''
+            SELECT h.simhash, s.sentiment, s.explanation
+            FROM simhash_index h
+            JOIN sentiment s
+            ON s.source = h.source AND s.pubDate = h.pubDate AND s.title = h.title
+            WHERE {condition}
+        ''', bands).fetchall()
+
+        best = None
+        for candidate, (sentiment, explanation) in self._scored_simhashes:
+            distance = hamming_distance(value, candidate)
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, sentiment, explanation)
+        for candidate, sentiment, explanation in candidates:
+            distance = hamming_distance(value, candidate)
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, sentiment, explanation)
+        return best[1:] if best else None
+
+    def resolve(self, content_hash, result):
+        """
+        Finishes an in-flight article with its (sentiment, explanation), or None if it failed.
+
+        Returns [(key, label_source)] of the articles that waited for it, which get the
+        same result. If it failed, they are dropped and stay unscored until a later run.
+        """
+        key, value, followers = self._in_flight.pop(content_hash)
+        if result is None:
+            return []
+
+        self._scored[content_hash] = result
+        self._scored_simhashes.append((value, result))
+        self._index(key, value)
+        for follower, follower_value, label_source in followers:
+            if label_source == 'cache':
+                self.exact_hits += 1
+            else:
+                self.near_hits += 1
+                self._index(follower, follower_value)
+                self._scored_simhashes.append((follower_value, result))
+        return [(follower, label_source) for follower, _, label_source in followers]
+
+    def summary(self):
+        hits = self.exact_hits + self.near_hits
+        rate = 100 * hits / self.lookups if self.lookups else 0
+        return (f"{hits}/{self.lookups} article(s) reused an existing result ({rate:.0f}%): "
+                f"{self.exact_hits} identical, {self.near_hits} near-duplicate")
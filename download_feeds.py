@@ -1,37 +1,111 @@
+import argparse
 import sys
+import threading
 import yaml
 
-from rss_downloader import RSSDownloader
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+from http_session import POOL_MAXSIZE, configure_session
+from rss_downloader import DEFAULT_TIMEOUT, RSSDownloader
+
+DEFAULT_WORKERS = 8
+DEFAULT_PER_HOST = 2
+
+
+def _download_feed(feed, db_path, raw_storage_path, timeout, item_queue):
+    downloader = RSSDownloader(
+        source_name=feed["name"],
+        source_uri=feed["url"],
+        db_path=db_path,
+        raw_storage_path=raw_storage_path,
+        timeout=timeout,
+        item_queue=item_queue
+    )
+    downloader.download_items()
+    downloader.archive_old_items()
+
+
+def _interleave_by_host(feeds):
+    """Orders feeds round-robin across hosts so workers don't queue up behind one server."""
+    by_host = defaultdict(list)
+    for feed in feeds:
+        by_host[urlparse(feed["url"]).netloc.lower()].append(feed)
+
+    ordered = []
+    queues = list(by_host.values())
+    while queues:
+        ordered.extend(queue.pop(0) for queue in queues)
+        queues = [queue for queue in queues if queue]
+    return ordered
+
+
+def download_feeds(feeds, db_path, raw_storage_path, workers=DEFAULT_WORKERS,
+                   per_host=DEFAULT_PER_HOST, timeout=DEFAULT_TIMEOUT, item_queue=None):
+    """
+    Downloads all feeds using a thread pool.
+
+    At most `workers` feeds are fetched at once, and at most `per_host` of them
+    from the same host. Yields (feed, exception) as each feed completes;
+    exception is None on success. New items are published to `item_queue`, if
+    given (see RSSDownloader).
+    """
+    workers = max(1, workers)
+    per_host = max(1, per_host)  # 0 would never let a feed through
+
+    # Keep at least one pooled connection alive per concurrent request to a host
+    configure_session(pool_maxsize=max(per_host, POOL_MAXSIZE))
+
+    host_locks = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+    host_locks_guard = threading.Lock()
+
+    def run(feed):
+        host = urlparse(feed["url"]).netloc.lower()
+        with host_locks_guard:
+            host_lock = host_locks[host]
+        with host_lock:
+            _download_feed(feed, db_path, raw_storage_path, timeout, item_queue)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run, feed): feed for feed in _interleave_by_host(feeds)}
+        for future in as_completed(futures):
+            yield futures[future], future.exception()
 
 
 def main(args):
-    if len(args) != 1:
-        print("Usage: download_feeds.py feeds.yaml")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Download all feeds listed in a YAML file.")
+    parser.add_argument("feeds_path", help="Path to feeds YAML file")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Max feeds downloaded at once (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST,
+                        help=f"Max concurrent connections per host (default: {DEFAULT_PER_HOST})")
+    parser.add_argument("--connect-timeout", type=float, default=DEFAULT_TIMEOUT[0],
+                        help=f"Connect timeout in seconds (default: {DEFAULT_TIMEOUT[0]})")
+    parser.add_argument("--read-timeout", type=float, default=DEFAULT_TIMEOUT[1],
+                        help=f"Read timeout in seconds (default: {DEFAULT_TIMEOUT[1]})")
+    parsed = parser.parse_args(args)
 
-    feeds_path = args[0]
     try:
-        with open(feeds_path) as f:
+        with open(parsed.feeds_path) as f:
             data = yaml.safe_load(f)
     except BaseException as ex:
         print(f"Error parsing feeds: {ex}")
         sys.exit(1)
 
-    for feed in data:
-        feed_name = feed["name"]
-        feel_url = feed["url"]
-
-        try:        
-            downloader = RSSDownloader(
-                source_name=feed_name,
-                source_uri=feel_url,
-                db_path="rss_storage.sqlite",
-                raw_storage_path="rss_raw_data"
-            )
-            downloader.download_items()
-            downloader.archive_old_items()
-        except BaseException as ex:
-            print(f"Error downloading feed {feed_name}@{feel_url}: {ex}")
+    results = download_feeds(
+        data,
+        db_path="rss_storage.sqlite",
+        raw_storage_path="rss_raw_data",
+        workers=parsed.workers,
+        per_host=parsed.per_host,
+        timeout=(parsed.connect_timeout, parsed.read_timeout)
+    )
+    for feed, ex in results:
+        if ex is not None:
+            print(f"Error downloading feed {feed['name']}@{feed['url']}: {ex}")
+        else:
+            print(f"Downloaded feed {feed['name']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+"""
+Shared, pooled HTTP session for outbound requests.
+
+Feed downloads and the local LLM server probes all go through get_session(), so
+connections (and TLS sessions) to the same host are kept alive and reused across
+feeds instead of being re-established on every request.
+
+- Advertises every content encoding urllib3 can decode (gzip, deflate and br when
+  brotli is installed).
+- Retries transient failures (connection errors, 429 and 5xx) with exponential
+  backoff for remote hosts. A server's Retry-After is honored up to
+  MAX_RETRY_AFTER seconds, so one overloaded host can't hold a download worker
+  (and the whole run) for an hour. Local LLM servers are probed without retries
+  so a stopped server is detected immediately.
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+POOL_CONNECTIONS = 32   # number of hosts to keep connection pools for
+POOL_MAXSIZE = 8        # connections kept alive per host
+RETRIES = 3
+BACKOFF_FACTOR = 0.5    # sleeps 0.5s, 1s, 2s between retries
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRY_AFTER = 10    # seconds; longer Retry-After values are cut down to this
+
+_LOCAL_PREFIXES = ('http://localhost:', 'http://127.0.0.1:')
+
+_session = None
+_settings = None  # arguments _session was built with
+_lock = threading.Lock()
+
+
+class _CappedRetry(Retry):
+    """Retry that waits at most MAX_RETRY_AFTER seconds for a Retry-After header."""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, MAX_RETRY_AFTER)
+
+
+def _build_session(pool_connections, pool_maxsize, retries, backoff_factor):
+    session = requests.Session()
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+
+    retry = _CappedRetry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False,
+    )
+    remote = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session.mount('http://', remote)
+    session.mount('https://', remote)
+
+    local = HTTPAdapter(pool_connections=len(_LOCAL_PREFIXES), pool_maxsize=pool_maxsize, max_retries=0)
+    for prefix in _LOCAL_PREFIXES:
+        session.mount(prefix, local)
+    return session
+
+
+def configure_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                      retries=RETRIES, backoff_factor=BACKOFF_FACTOR):
+    """(Re)creates the shared session with the given pool and retry settings.
+
+    The session is kept, with its warm connections, if the settings are unchanged.
+    A replaced session is not closed: other threads may still be using it (an LLM
+    health probe during a streaming run, say). Its pooled connections are released
+    once the last reference to it goes away.
+    """
+    global _session, _settings
+    settings = (pool_connections, pool_maxsize, retries, backoff_factor)
+    with _lock:
+        if _session is None or settings != _settings:
+            _session, _settings = _build_session(*settings), settings
+        return _session
+
+
+def get_session():
+    """Returns the process-wide session, creating it with the default settings on first use."""
+    global _session, _settings
+    with _lock:
+        if _session is None:
+            _settings = (POOL_CONNECTIONS, POOL_MAXSIZE, RETRIES, BACKOFF_FACTOR)
+            _session = _build_session(*_settings)
+        return _session
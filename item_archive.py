@@ -0,0 +1,75 @@
+"""
+Append-only monthly archives of raw feed items.
+
+Each source has, per month, a segment file and a sidecar index:
+
+    archives/SOURCE/archive_YYYY_MM.xml.gz   one gzip member per item, appended
+    archives/SOURCE/archive_YYYY_MM.idx      one "key<TAB>offset<TAB>length" line per item
+
+The key is the item's filename without ".xml" (timestamp + title hash). Since the
+members are concatenated, the segment is still a valid gzip stream that decompresses
+to the month's item documents back to back, while a single item can be read by
+decompressing only its own bytes. Archiving more items for a month appends to both
+files, so earlier items are never rewritten or lost.
+"""
+
+import gzip
+import os
+
+SEGMENT_SUFFIX = '.xml.gz'
+INDEX_SUFFIX = '.idx'
+
+
+def archive_paths(archive_dir, month):
+    """Returns (segment_path, index_path) for a YYYY_MM month."""
+    base = os.path.join(archive_dir, f"archive_{month}")
+    return base + SEGMENT_SUFFIX, base + INDEX_SUFFIX
+
+
+def item_key(filename):
+    """Returns the archive key for an item filename."""
+    return filename[:-len('.xml')] if filename.endswith('.xml') else filename
+
+
+def append_items(archive_dir, month, items):
+    """
+    Appends (key, xml_bytes) items to the month's segment and index.
+
+    The segment is flushed to disk before the index entries are written, so an
+    interrupted append can leave unreferenced bytes in the segment but never an
+    index entry pointing at missing data.
+    """
+    segment_path, index_path = archive_paths(archive_dir, month)
+
+    entries = []
+    with open(segment_path, 'ab') as segment:
+        offset = segment.seek(0, os.SEEK_END)
+        for key, xml_bytes in items:
+            member = gzip.compress(xml_bytes, mtime=0)
+            segment.write(member)
+            entries.append(f"{key}\t{offset}\t{len(member)}\n")
+            offset += len(member)
+        segment.flush()
+        os.fsync(segment.fileno())
+
+    with open(index_path, 'a', encoding='utf-8') as index:
+        index.writelines(entries)
+        index.flush()
+        os.fsync(index.fileno())
+
+
+def load_index(index_path):
+    """Returns {key: (offset, length)} for an index file; later entries win."""
+    index = {}
+    with open(index_path, encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) != 3:
+                continue  # partially written line
+            index[parts[0]] = (int(parts[1]), int(parts[2]))
+    return index
+
+
+def read_member(segment_data, offset, length):
+    """Decompresses a single item from a segment's contents (bytes or a memory map)."""
+    return gzip.decompress(segment_data[offset:offset + length])
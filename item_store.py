@@ -0,0 +1,140 @@
+"""
+Unified read access to raw feed items, wherever they are stored.
+
+ItemStore resolves (source, pubDate, title) to the item's XML, looking in order at:
+
+1. the loose file rss_raw_data/SOURCE/<key>.xml written at download time
+2. the month's append-only archive (see item_archive), using its sidecar
+   key -> offset index and a memory map of the segment, so only the item's own
+   bytes are decompressed
+3. a legacy archive_YYYY_MM.xml written before archives were append-only, which
+   is parsed once per process and indexed by key
+
+Indexes and memory maps are cached per (source, month) for the lifetime of the store.
+An item that is stored but can't be read back (a truncated gzip member, a stale index
+offset, malformed XML) is treated like a missing one: a warning is printed and None
+is returned.
+"""
+
+import mmap
+import os
+import xml.etree.ElementTree as ET
+import zlib
+
+from item_archive import archive_paths, item_key, load_index, read_member
+from utils import ATOM_NS, generate_filename
+
+
+class ItemStore:
+    def __init__(self, raw_storage_path):
+        self.raw_storage_path = raw_storage_path
+        self._archives = {}         # (source, month) -> (index, mmap or None)
+        self._legacy_archives = {}  # (source, month) -> {key: xml_bytes}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for _, segment_map in self._archives.values():
+            if segment_map is not None:
+                segment_map.close()
+        self._archives.clear()
+        self._legacy_archives.clear()
+
+    def load_item_bytes(self, source, pubDate, title):
+        """Returns the item's XML document as bytes, or None if it isn't stored anywhere."""
+        filename = generate_filename(title, pubDate)
+        key = item_key(filename)
+        month = filename[:7]  # YYYY_MM format
+
+        file_path = os.path.join(self.raw_storage_path, source, filename)
+        if os.path.exists(file_path):
+            with open(file_path, 'rb') as f:
+                return f.read()
+
+        xml_bytes = self._read_archived(source, month, key)
+        if xml_bytes is None:
+            xml_bytes = self._read_legacy_archived(source, month, key)
+        return xml_bytes
+
+    def load_item(self, source, pubDate, title):
+        """Returns the item's root element, or None if it isn't stored anywhere or is unreadable."""
+        xml_bytes = self.load_item_bytes(source, pubDate, title)
+        if xml_bytes is None:
+            return None
+        try:
+            return ET.fromstring(xml_bytes)
+        except ET.ParseError as e:
+            print(f"Unreadable item {source}, {pubDate}, {title}: {e}")
+            return None
+
+    def _archive_dir(self, source):
+        return os.path.join(self.raw_storage_path, "archives", source)
+
+    def _open_archive(self, source, month):
+        segment_path, index_path = archive_paths(self._archive_dir(source), month)
+        if not os.path.exists(index_path) or not os.path.exists(segment_path) \
+                or not os.path.getsize(segment_path):
+            return {}, None
+        with open(segment_path, 'rb') as f:
+            segment_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return load_index(index_path), segment_map
+
+    def _read_archived(self, source, month, key):
+        cache_key = (source, month)
+        if cache_key not in self._archives:
+            self._archives[cache_key] = self._open_archive(source, month)
+        index, segment_map = self._archives[cache_key]
+
+        if key not in index:
+            # Reopen only if the archive has grown since it was opened
+            segment_path, _ = archive_paths(self._archive_dir(source), month)
+            mapped_size = len(segment_map) if segment_map is not None else 0
+            if not os.path.exists(segment_path) or os.path.getsize(segment_path) == mapped_size:
+                return None
+            if segment_map is not None:
+                segment_map.close()
+            index, segment_map = self._archives[cache_key] = self._open_archive(source, month)
+            if key not in index:
+                return None
+
+        offset, length = index[key]
+        try:
+            return read_member(segment_map, offset, length)
+        except (zlib.error, EOFError, OSError) as e:  # truncated member or stale offset
+            print(f"Unreadable archived item {key} in {source} {month}: {e}")
+            return None
+
+    def _read_legacy_archived(self, source, month, key):
+        cache_key = (source, month)
+        if cache_key not in self._legacy_archives:
+            self._legacy_archives[cache_key] = self._load_legacy_archive(source, month)
+        return self._legacy_archives[cache_key].get(key)
+
+    def _load_legacy_archive(self, source, month):
+        archive_path = os.path.join(self._archive_dir(source), f"archive_{month}.xml")
+        if not os.path.exists(archive_path):
+            return {}
+
+        try:
+            root = ET.parse(archive_path).getroot()
+        except ET.ParseError as e:
+            print(f"Unreadable legacy archive {archive_path}: {e}")
+            return {}
+
+        items = {}
+        for item in root:
+            title = item.findtext('title') or item.findtext(ATOM_NS + 'title')
+            pubDate = item.findtext('pubDate') or item.findtext(ATOM_NS + 'published') or \
+                item.findtext(ATOM_NS + 'updated')
+            if not title or not pubDate:
+                continue
+            try:
+                key = item_key(generate_filename(title, pubDate))
+            except AttributeError:
+                continue
+            items[key] = ET.tostring(item, encoding='utf-8', xml_declaration=True)
+        return items
@@ -0,0 +1,132 @@
+"""
+Extraction of the text that sentiment analysis runs on.
+
+The cleaned title and description are extracted once, when RSSDownloader stores an
+item, and kept in the item_text table together with their length and a hash of the
+normalized text. analyze_articles then reads them straight from SQLite.
+"""
+
+import hashlib
+import re
+import xml.etree.ElementTree as ET
+
+from analysis_attempts import MissingContentError, init_analysis_attempts_table, record_failures
+from item_store import ItemStore
+from utils import ATOM_NS
+
+
+def init_item_text_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS item_text (
+            source TEXT,
+            pubDate TEXT,
+            title TEXT,
+            clean_title TEXT,
+            description TEXT,
+            length INTEGER,
+            content_hash TEXT,
+            PRIMARY KEY (source, pubDate, title)
+        )
+    ''')
+
+
+def extract_with_custom_rules(raw_html):
+    from bs4 import BeautifulSoup  # only needed when items are downloaded or backfilled
+    soup = BeautifulSoup(raw_html, "html.parser")
+
+    # Get text within <p> tags
+    paragraphs = [p.get_text() for p in soup.find_all("p")]
+
+    # Optionally, get 'title' attribute from the first image, if present
+    image_title = ""
+    image = soup.find("img", title=True)
+    if image:
+        image_title = image["title"]
+
+    # Combine both
+    combined_text = " ".join(paragraphs) + \
+        (f" {image_title}" if image_title else "")
+    return combined_text if combined_text else soup.get_text()
+
+
+def _find_text(item, *keys):
+    for key in keys:
+        sub_item = item.find(key)
+        if sub_item is not None and sub_item.text:
+            return sub_item.text
+    return None
+
+
+def process_rss_item(item):
+    """Returns (title, description) for an RSS item or Atom entry, with the description's HTML stripped."""
+    title = _find_text(item, 'title', ATOM_NS + 'title') or "No title"
+    description_raw = _find_text(item, 'description', ATOM_NS + 'summary', ATOM_NS + 'content')
+    description = None
+    if description_raw:
+        description = extract_with_custom_rules(description_raw)
+
+    return title, description
+
+
+def content_hash(title, description):
+    """Hashes the title and description after lowercasing and collapsing whitespace."""
+    normalized = re.sub(r'\s+', ' ', f"{title}\n{description or ''}").strip().lower()
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def item_text_row(source, pubDate, title, item):
+    """Builds the item_text row for a feed item."""
+    clean_title, description = process_rss_item(item)
+    return (source, pubDate, title, clean_title, description,
+            len(description) if description else 0, content_hash(clean_title, description))
+
+
+def store_item_text(conn, rows):
+    conn.executemany('''
+        INSERT OR REPLACE INTO item_text
+            (source, pubDate, title, clean_title, description, length, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+
+
+def backfill_item_text(conn, raw_storage_path):
+    """
+    Extracts item_text for items stored before the table existed.
+
+    Reads each item's XML once, from its loose file or its archive. Items that
+    aren't stored anywhere, or can't be read or parsed, are recorded as dead in
+    analysis_attempts, so they aren't looked for again. Returns the number of rows added.
+    """
+    init_item_text_table(conn)
+    init_analysis_attempts_table(conn)
+    missing = conn.execute('''
+        SELECT r.source, r.pubDate, r.title
+        FROM rss_items r
+        LEFT JOIN item_text t
+        ON r.source = t.source AND r.pubDate = t.pubDate AND r.title = t.title
+        LEFT JOIN analysis_attempts a
+        ON r.source = a.source AND r.pubDate = a.pubDate AND r.title = a.title
+        WHERE t.source IS NULL AND a.source IS NULL
+    ''').fetchall()
+
+    rows = []
+    failures = []
+    with ItemStore(raw_storage_path) as store:
+        for source, pubDate, title in missing:
+            key = (source, pubDate, title)
+            try:
+                item = store.load_item(source, pubDate, title)
+                if item is not None:
+                    rows.append(item_text_row(source, pubDate, title, item))
+                    continue
+                error = MissingContentError("Raw item not found")
+            except AttributeError:
+                error = MissingContentError("Raw item not found")  # unparseable pubDate, no file was ever written
+            except (ET.ParseError, OSError) as e:
+                error = MissingContentError(f"Raw item unreadable: {e}")  # corrupt or truncated file
+            failures.append((key, error))
+
+    store_item_text(conn, rows)
+    record_failures(conn, failures)
+    conn.commit()
+    return len(rows)
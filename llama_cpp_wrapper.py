@@ -1,62 +1,70 @@
+import json
 import subprocess
-import time
 import requests
 import platform
-import psutil
 import sys
 import yaml
 
 from pathlib import Path
+from urllib.parse import urlparse
 
+from http_session import get_session
+from llm_wrapper import DEFAULT_TIMEOUT, LLMWrapper
 
-class LlamaCppWrapper:
-    def __init__(self):
+DEFAULT_URL = "http://localhost:8080"
 
-        script_dir = Path(__file__).resolve().parent
-        config_path = script_dir / "llama-cpp-config.yaml"
 
-        if not config_path.exists():
-            raise Exception(f"Cannot find {config_path}")
+class LlamaCppWrapper(LLMWrapper):
+    name = "Server"
 
-        with open(config_path) as f:
-            data = yaml.safe_load(f)
-
-        self.server_path = data["server_path"]
-        self.model_path = data["model_path"]
-        self.started_here = False
-        self.process = None
+    def __init__(self, parallel=None, timeout=DEFAULT_TIMEOUT, url=DEFAULT_URL, on_call=None):
+        super().__init__(timeout, on_call)
+        self.url = url
+        self.health_url = f"{url}/health"  # 503 until the model is loaded
+        self.parallel = parallel  # -np slots for a server we start; 1 keeps llama-server's default
 
     def _is_client_running(self):
         try:
-            requests.get("http://localhost:8080", timeout=1)
+            get_session().get(self.url, timeout=1)
             return True
         except requests.RequestException:
             return False
 
-    def start(self):
-        if self._is_client_running():
-            print("Server already already running.")
-            return
-
+    def _launch_server(self):
         print("Starting llama-cpp-server...")
         creationflags = 0
         if platform.system() == 'Windows':
             creationflags = subprocess.CREATE_NO_WINDOW  # Hide the window
 
+        # Only needed to launch the server, not to use one that is already running
+        config_path = Path(__file__).resolve().parent / "llama-cpp-config.yaml"
+        if not config_path.exists():
+            raise Exception(f"Cannot find {config_path}")
+        with open(config_path) as f:
+            data = yaml.safe_load(f)
+
+        command = [data["server_path"], "-m", data["model_path"]]
+        if self.parallel and self.parallel > 1:
+            command += ["-np", str(self.parallel)]
+        if self.url != DEFAULT_URL:
+            address = urlparse(self.url)
+            command += ["--host", address.hostname, "--port", str(address.port or 80)]
+
         self.process = subprocess.Popen(
-            [self.server_path, "-m", self.model_path],
+            command,
             creationflags=creationflags if platform.system() == 'Windows' else 0
         )
 
-        self.started_here = True
-        time.sleep(2)  # Give server a moment to start
-
     def stop(self):
+        print(f"{self.name} timing: {self.timing_summary()}")
+        self._disconnect()
+
         if not self.started_here:
             print("Not stopping server since we didn't start it.")
             return
 
         print("Stopping server...")
+        import psutil
         for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
             try:
                 if 'llama-server' in proc.info['name'] or (
@@ -65,13 +73,22 @@ class LlamaCppWrapper:
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 continue
 
-    def generate(self, prompt, options):
+    def _create_client(self):
         from openai import OpenAI
-        client = OpenAI(base_url="http://localhost:8080/v1", api_key="nocare")
+        return OpenAI(base_url=f"{self.url}/v1", api_key="nocare", timeout=self.timeout)
+
+    def _warm_up(self):
+        self.client.chat.completions.create(
+            model="local-model",
+            messages=[{"role": "user", "content": "Hi"}],
+            max_tokens=1,
+        )
+
+    def _generate(self, prompt, options):
         temperature = None
         if "temperature" in options:
             temperature = options["temperature"]
-        response = client.chat.completions.create(
+        response = self.client.chat.completions.create(
             model="local-model",
             messages=[
                 {"role": "user", "content": prompt}
@@ -80,12 +97,21 @@ class LlamaCppWrapper:
         )
         return response.choices[0].message.content
 
-    def run_inference(self, prompt, options={}):
-        try:
-            self.start()
-            return self.generate(prompt, options)
-        finally:
-            self.stop()
+    def _generate_labels(self, prompt, labels, count, options):
+        # GBNF grammar for "label,label,...": nothing else can be sampled
+        label_rule = " | ".join(json.dumps(label) for label in labels)
+        root_rule = ' "," '.join(["label"] * count)
+        grammar = f"root ::= {root_rule}\nlabel ::= {label_rule}"
+        response = self.client.chat.completions.create(
+            model="local-model",
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            temperature=options.get("temperature"),
+            max_tokens=4 * count,
+            extra_body={"grammar": grammar},
+        )
+        return response.choices[0].message.content.strip().split(",")
 
 
 def main(args):
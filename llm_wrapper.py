@@ -0,0 +1,153 @@
+"""
+Shared interface of the local LLM runtime wrappers (OllamaWrapper, LlamaCppWrapper).
+
+A wrapper is used as:
+
+    wrapper.start()                     # launch the server if needed, wait for it, warm the model up
+    wrapper.generate(prompt, options)   # any number of times, from any thread
+    wrapper.generate_labels(prompt, labels, count)
+    wrapper.stop()                      # stop the server if we started it
+
+start() polls the server's health endpoint with backoff until it answers (or the
+deadline passes), then sends one warm-up request so the model is loaded before the
+first real prompt. The SDK client is created once in start() and reused for every
+generate() call, so its HTTP connection pool stays warm for the whole run. Time spent
+creating the client and in generate() calls is tracked and printed by stop(); pass
+`on_call` to also receive the duration of every call (e.g. to collect latencies).
+
+generate_labels() constrains the output to `count` labels from a fixed set (a JSON
+schema for Ollama, a grammar for llama-server) and caps the number of generated
+tokens, so the model can't drift into free-form text.
+"""
+
+import abc
+import threading
+import time
+
+import requests
+
+from http_session import get_session
+
+DEFAULT_TIMEOUT = 120  # seconds allowed for a single generate request
+READY_TIMEOUT = 180    # seconds allowed for the server to come up and load the model
+
+
+class LLMWrapper(abc.ABC):
+    name = "Server"
+    health_url = None
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, on_call=None):
+        self.timeout = timeout
+        self.on_call = on_call  # called with the seconds taken by each generate call
+        self.client = None
+        self.started_here = False
+        self.process = None
+
+        self._lock = threading.Lock()
+        self.client_setup_seconds = 0.0
+        self.generate_calls = 0
+        self.generate_seconds = 0.0
+
+    @abc.abstractmethod
+    def _is_client_running(self):
+        """Returns True if the server is already running."""
+
+    @abc.abstractmethod
+    def _launch_server(self):
+        """Starts the server process in the background."""
+
+    @abc.abstractmethod
+    def _create_client(self):
+        """Returns the SDK client used for every request."""
+
+    @abc.abstractmethod
+    def _warm_up(self):
+        """Sends one request so the model is loaded before the first real prompt."""
+
+    @abc.abstractmethod
+    def _generate(self, prompt, options):
+        """Returns the model's text response to the prompt."""
+
+    @abc.abstractmethod
+    def _generate_labels(self, prompt, labels, count, options):
+        """Returns the list of labels the model generated for the prompt."""
+
+    def _is_ready(self):
+        try:
+            return get_session().get(self.health_url, timeout=1).status_code == 200
+        except requests.RequestException:
+            return False
+
+    def _wait_until_ready(self, deadline):
+        """Polls the health endpoint with exponential backoff until it answers 200."""
+        delay = 0.1
+        while not self._is_ready():
+            if self.process is not None and self.process.poll() is not None:
+                raise RuntimeError(f"{self.name} exited with code {self.process.returncode} while starting")
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(f"{self.name} not ready after {READY_TIMEOUT}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+    def start(self):
+        started = time.monotonic()
+        if self._is_client_running():
+            print(f"{self.name} already running.")
+        else:
+            self._launch_server()
+            self.started_here = True
+
+        self._wait_until_ready(started + READY_TIMEOUT)
+        self._connect()
+        self._warm_up()
+        print(f"{self.name} ready in {time.monotonic() - started:.1f}s")
+
+    def _connect(self):
+        """Creates the client unless it already exists."""
+        with self._lock:
+            if self.client is None:
+                started = time.perf_counter()
+                self.client = self._create_client()
+                self.client_setup_seconds += time.perf_counter() - started
+
+    def _disconnect(self):
+        with self._lock:
+            if self.client is not None and hasattr(self.client, 'close'):
+                self.client.close()
+            self.client = None
+
+    def generate(self, prompt, options):
+        return self._timed(self._generate, prompt, options)
+
+    def generate_labels(self, prompt, labels, count=1, options=None):
+        """Returns a list of `count` labels, each one of `labels`."""
+        result = self._timed(self._generate_labels, prompt, labels, count, options or {})
+        if len(result) != count or any(label not in labels for label in result):
+            raise ValueError(f"Expected {count} label(s) out of {labels}, got {result}")
+        return result
+
+    def _timed(self, method, *args):
+        self._connect()  # no-op after start()
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.generate_calls += 1
+                self.generate_seconds += elapsed
+            if self.on_call is not None:
+                self.on_call(elapsed)
+
+    def timing_summary(self):
+        average = self.generate_seconds / self.generate_calls if self.generate_calls else 0
+        return (f"client setup {self.client_setup_seconds:.3f}s, "
+                f"{self.generate_calls} generate call(s) in {self.generate_seconds:.1f}s "
+                f"(avg {average:.2f}s)")
+
+    def run_inference(self, prompt, options=None):
+        try:
+            self.start()
+            return self.generate(prompt, options or {})
+        finally:
+            self.stop()
@@ -0,0 +1,171 @@
+"""
+Load probes, and the Throttle that analyze_articles uses to back off while the machine is busy.
+
+A probe's sample() returns a load percentage (0-100), or None when it can't be
+measured, which never counts as busy:
+
+- NvidiaSmiProbe: GPU utilization from nvidia-smi. Given `exclude_processes`, only the
+  utilization of other processes counts, so the LLM server's own load is ignored.
+- CpuProbe / MemoryProbe: system CPU and memory use from psutil.
+- FakeProbe: replays given values, for trying out thresholds and modes.
+
+Throttle samples its probes at most every `interval` seconds and, while any of them
+is above its threshold, limits how much work may be in flight:
+
+- 'pause': no new prompts; those in flight finish. Resumes when the load drops.
+- 'slow':  one prompt at a time. Resumes full concurrency when the load drops.
+- 'drain': no new prompts; once those in flight finish the run stops.
+
+Time spent throttled is recorded and printed with summary().
+"""
+
+import abc
+import subprocess
+import time
+
+PAUSE = 'pause'
+SLOW = 'slow'
+DRAIN = 'drain'
+MODES = (PAUSE, SLOW, DRAIN)
+_ACTIONS = {PAUSE: "pausing", SLOW: "slowing down", DRAIN: "draining and stopping"}
+
+DEFAULT_INTERVAL = 5.0
+LLM_PROCESSES = ('ollama', 'llama-server')
+
+
+class LoadProbe(abc.ABC):
+    name = "load"
+
+    @abc.abstractmethod
+    def sample(self):
+        """Returns the current load percentage, or None if it can't be measured."""
+
+
+class NvidiaSmiProbe(LoadProbe):
+    name = "GPU"
+
+    def __init__(self, exclude_processes=()):
+        self.exclude_processes = exclude_processes
+
+    def sample(self):
+        try:
+            if self.exclude_processes:
+                return self._sample_other_processes()
+            return self._sample_total()
+        except (FileNotFoundError, subprocess.TimeoutExpired, ValueError):
+            return None
+
+    def _sample_total(self):
+        result = subprocess.run(
+            ['nvidia-smi', '--query-gpu=utilization.gpu', '--format=csv,noheader,nounits'],
+            capture_output=True, text=True, timeout=5
+        )
+        if result.returncode != 0:
+            return None
+        values = [int(v.strip()) for v in result.stdout.strip().splitlines() if v.strip().isdigit()]
+        return max(values) if values else None
+
+    def _sample_other_processes(self):
+        # Lines look like "0  12345  C  45  20  -  -  ollama"; the SM% column is the 4th
+        result = subprocess.run(['nvidia-smi', 'pmon', '-c', '1', '-s', 'u'],
+                                capture_output=True, text=True, timeout=10)
+        if result.returncode != 0:
+            return None
+        total = 0
+        for line in result.stdout.splitlines():
+            parts = line.split()
+            if not parts or parts[0].startswith('#') or len(parts) < 5:
+                continue
+            if any(name in parts[-1] for name in self.exclude_processes):
+                continue
+            if parts[3].isdigit():
+                total += int(parts[3])
+        return min(total, 100)
+
+
+class CpuProbe(LoadProbe):
+    name = "CPU"
+
+    def __init__(self):
+        import psutil
+        psutil.cpu_percent(interval=None)  # the first call only starts the measurement and returns 0.0
+
+    def sample(self):
+        import psutil
+        return psutil.cpu_percent(interval=None)  # since the previous call
+
+
+class MemoryProbe(LoadProbe):
+    name = "memory"
+
+    def sample(self):
+        import psutil
+        return psutil.virtual_memory().percent
+
+
+class FakeProbe(LoadProbe):
+    name = "fake"
+
+    def __init__(self, values):
+        self.values = list(values)
+
+    def sample(self):
+        # Replays the values in order, then keeps returning the last one
+        return self.values.pop(0) if len(self.values) > 1 else self.values[0]
+
+
+class Throttle:
+    def __init__(self, limits, mode=PAUSE, interval=DEFAULT_INTERVAL):
+        """`limits` is a list of (probe, threshold percentage)."""
+        if mode not in MODES:
+            raise ValueError(f"Unknown throttle mode {mode!r}, expected one of {MODES}")
+        self.limits = limits
+        self.mode = mode
+        self.interval = interval
+        self.busy = False
+        self.stopped = False
+        self.throttled_seconds = 0.0
+        self.episodes = 0
+        self._last_sample = None
+        self._busy_since = None
+
+    def _sample(self):
+        now = time.monotonic()
+        if self._last_sample is not None and now - self._last_sample < self.interval:
+            return
+        self._last_sample = now
+
+        over = []
+        for probe, threshold in self.limits:
+            value = probe.sample()
+            if value is not None and value > threshold:
+                over.append(f"{probe.name} {value:.0f}% > {threshold}%")
+
+        if over and not self.busy:
+            self.episodes += 1
+            self._busy_since = now
+            print(f"Load too high ({', '.join(over)}), {_ACTIONS[self.mode]} analysis")
+        elif not over and self.busy:
+            self.throttled_seconds += now - self._busy_since
+            print(f"Load back to normal after {now - self._busy_since:.1f}s, resuming analysis")
+        self.busy = bool(over)
+        if self.busy and self.mode == DRAIN:
+            self.stopped = True
+
+    def allowed_concurrency(self, concurrency):
+        """Returns how many prompts may be in flight right now."""
+        self._sample()
+        if self.stopped:
+            return 0
+        if not self.busy:
+            return concurrency
+        return 1 if self.mode == SLOW else 0
+
+    def finish(self):
+        """Stops the clock of a throttling episode still going on at the end of the run."""
+        if self.busy:
+            self.throttled_seconds += time.monotonic() - self._busy_since
+            self._busy_since = time.monotonic()
+
+    def summary(self):
+        return f"throttled {self.episodes} time(s), for {self.throttled_seconds:.1f}s in total ({self.mode})"
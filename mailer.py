@@ -5,12 +5,6 @@ import sys
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-
-from google_auth_oauthlib.flow import InstalledAppFlow
-
 # Scopes for Gmail API
 SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
 
@@ -70,6 +64,12 @@ def authenticate_gmail():
     """
     Authenticates.
     """
+    # The Google client libraries are slow to import; only load them when sending
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+
     creds = None
     # The file token.json stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first
@@ -1,48 +1,63 @@
+import json
+import os
 import subprocess
-import time
 import requests
 import platform
-import psutil
 import sys
 
+from http_session import get_session
+from llm_wrapper import DEFAULT_TIMEOUT, LLMWrapper
 
-class OllamaWrapper:
-    def __init__(self, model='llama3'):
+DEFAULT_URL = "http://localhost:11434"
+
+
+class OllamaWrapper(LLMWrapper):
+    name = "Ollama"
+
+    def __init__(self, model='llama3', num_parallel=None, timeout=DEFAULT_TIMEOUT, keep_alive="30m",
+                 url=DEFAULT_URL, on_call=None):
+        super().__init__(timeout, on_call)
         self.model = model
-        self.started_here = False
-        self.process = None
+        self.url = url
+        self.health_url = f"{url}/api/tags"
+        self.keep_alive = keep_alive  # how long Ollama keeps the model loaded after a request
+        self.num_parallel = num_parallel  # OLLAMA_NUM_PARALLEL for a server we start; 1 keeps Ollama's default
 
     def _is_client_running(self):
         try:
-            requests.get("http://localhost:11434", timeout=1)
+            get_session().get(self.url, timeout=1)
             return True
         except requests.RequestException:
             return False
 
-    def start(self):
-        if self._is_client_running():
-            print("Ollama already running.")
-            return
-
+    def _launch_server(self):
         print("Starting Ollama...")
         creationflags = 0
         if platform.system() == 'Windows':
             creationflags = subprocess.CREATE_NO_WINDOW  # Hide the window
 
+        env = os.environ.copy()
+        if self.num_parallel and self.num_parallel > 1:
+            env["OLLAMA_NUM_PARALLEL"] = str(self.num_parallel)
+        if self.url != DEFAULT_URL:
+            env["OLLAMA_HOST"] = self.url
+
         self.process = subprocess.Popen(
             ["ollama", "serve"],
-            creationflags=creationflags if platform.system() == 'Windows' else 0
+            creationflags=creationflags if platform.system() == 'Windows' else 0,
+            env=env
         )
 
-        self.started_here = True
-        time.sleep(2)  # Give server a moment to start
-
     def stop(self):
+        print(f"{self.name} timing: {self.timing_summary()}")
+        self._disconnect()
+
         if not self.started_here:
             print("Not stopping Ollama since we didn't start it.")
             return
 
         print("Stopping Ollama...")
+        import psutil
         for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
             try:
                 if 'ollama' in proc.info['name'] or (
@@ -51,18 +66,33 @@ class OllamaWrapper:
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 continue
 
-    def generate(self, prompt, options):
+    def _create_client(self):
         from ollama import Client
-        client = Client()
-        response = client.generate(model=self.model, prompt=prompt, options=options)
+        return Client(host=self.url, timeout=self.timeout)
+
+    def _warm_up(self):
+        # An empty prompt makes Ollama load the model without generating anything
+        self.client.generate(model=self.model, prompt="", keep_alive=self.keep_alive)
+
+    def _generate(self, prompt, options):
+        response = self.client.generate(model=self.model, prompt=prompt, options=options,
+                                        keep_alive=self.keep_alive)
         return response['response']
 
-    def run_inference(self, prompt, options = {}):
-        try:
-            self.start()
-            return self.generate(prompt, options)
-        finally:
-            self.stop()
+    def _generate_labels(self, prompt, labels, count, options):
+        schema = {
+            "type": "object",
+            "properties": {
+                "labels": {"type": "array", "items": {"type": "string", "enum": labels},
+                           "minItems": count, "maxItems": count},
+            },
+            "required": ["labels"],
+        }
+        # {"labels": ["-1", "0"]} takes a few tokens per label
+        options = dict(options, num_predict=8 + 6 * count)
+        response = self.client.generate(model=self.model, prompt=prompt, format=schema, options=options,
+                                        keep_alive=self.keep_alive)
+        return json.loads(response['response'])['labels']
 
 
 def main(args):
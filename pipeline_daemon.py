@@ -0,0 +1,172 @@
+"""
+Resident mode of run_pipeline (--daemon): runs pipeline cycles on an internal schedule
+from a single long-lived process, so imports, the LLM server and the loaded model
+are reused between cycles instead of being set up again on every run.
+
+A cycle runs right away, then `interval` seconds after the previous one finished.
+The daemon is controlled over HTTP, on localhost only:
+
+    GET  /status   state of the daemon, as JSON
+    POST /run      run a cycle now (also while paused)
+    POST /pause    skip scheduled cycles until resumed; a running cycle finishes
+    POST /resume   resume the schedule; an overdue cycle runs right away
+    POST /stop     exit once the running cycle, if any, has finished
+
+e.g. `curl -X POST -H 'Content-Type: application/json' http://127.0.0.1:8765/run`
+
+Web pages the user visits can also reach localhost, so requests from a browser are
+refused: a POST must have the JSON content type, which a page can't send cross-origin
+without a CORS preflight (never answered here), and must not carry an Origin header.
+Requests for any Host other than localhost / 127.0.0.1 are refused as well, which
+defeats DNS rebinding.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_CONTROL_PORT = 8765
+
+
+def _timestamp(ts):
+    return datetime.fromtimestamp(ts).isoformat(timespec='seconds') if ts else None
+
+
+class PipelineDaemon:
+    def __init__(self, run_cycle, interval, logger):
+        """`run_cycle` runs one pipeline cycle; `interval` is in seconds."""
+        self.run_cycle = run_cycle
+        self.interval = interval
+        self.logger = logger
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.paused = False
+        self.stopping = False
+        self.running = False
+        self.run_requested = False
+        self.next_run = time.time()
+        self.cycles = 0
+        self.last_started = None
+        self.last_finished = None
+        self.last_error = None
+
+    def _notify(self, **changes):
+        with self._lock:
+            for name, value in changes.items():
+                setattr(self, name, value)
+        self._wake.set()
+
+    def request_run(self):
+        self._notify(run_requested=True)
+
+    def pause(self):
+        self._notify(paused=True)
+
+    def resume(self):
+        self._notify(paused=False)
+
+    def stop(self):
+        self._notify(stopping=True)
+
+    def status(self):
+        with self._lock:
+            return {
+                'state': 'running' if self.running else 'paused' if self.paused else 'idle',
+                'paused': self.paused,
+                'cycles': self.cycles,
+                'last_started': _timestamp(self.last_started),
+                'last_finished': _timestamp(self.last_finished),
+                'last_error': self.last_error,
+                'next_run': None if self.paused else _timestamp(self.next_run),
+            }
+
+    def run_forever(self):
+        """Runs cycles when they are due or requested, until stop() is called."""
+        while True:
+            with self._lock:
+                if self.stopping:
+                    return
+                due = self.run_requested or (not self.paused and time.time() >= self.next_run)
+                if due:
+                    self.run_requested = False
+                    self.running = True
+                    self.last_started = time.time()
+                timeout = None if self.paused else max(0.0, self.next_run - time.time())
+
+            if not due:
+                self._wake.wait(timeout)
+                self._wake.clear()
+                continue
+
+            error = None
+            try:
+                self.run_cycle()
+            except Exception as e:
+                self.logger.exception('Pipeline cycle failed: %s', e)
+                error = f"{type(e).__name__}: {e}"
+
+            with self._lock:
+                self.running = False
+                self.cycles += 1
+                self.last_finished = time.time()
+                self.last_error = error
+                self.next_run = self.last_finished + self.interval
+            self.logger.info('Next cycle at %s', _timestamp(self.next_run))
+
+
+class _ControlHandler(BaseHTTPRequestHandler):
+    def _refused(self, post):
+        """Replies with an error and returns True unless the request comes from a local, non-browser client."""
+        port = self.server.server_address[1]
+        if self.headers.get('Host') not in (f'127.0.0.1:{port}', f'localhost:{port}'):
+            self._reply(403, {'error': 'unexpected Host header'})
+        elif post and 'Origin' in self.headers:
+            self._reply(403, {'error': 'browser requests are not allowed'})
+        elif post and self.headers.get_content_type() != 'application/json':
+            self._reply(415, {'error': 'Content-Type must be application/json'})
+        else:
+            return False
+        return True
+
+    def do_GET(self):
+        if self._refused(post=False):
+            return
+        if self.path == '/status':
+            self._reply(200, self.server.pipeline.status())
+        else:
+            self._reply(404, {'error': f'unknown path {self.path}'})
+
+    def do_POST(self):
+        if self._refused(post=True):
+            return
+        pipeline = self.server.pipeline
+        actions = {'/run': pipeline.request_run, '/pause': pipeline.pause,
+                   '/resume': pipeline.resume, '/stop': pipeline.stop}
+        if self.path not in actions:
+            self._reply(404, {'error': f'unknown path {self.path}'})
+            return
+        actions[self.path]()
+        pipeline.logger.info('Control: %s', self.path[1:])
+        self._reply(200, pipeline.status())
+
+    def _reply(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # requests are logged by do_POST; keep status polls out of the log
+
+
+def serve_control(pipeline, port=DEFAULT_CONTROL_PORT):
+    """Serves the control endpoint of `pipeline` from a background thread; returns the server."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), _ControlHandler)
+    server.pipeline = pipeline
+    threading.Thread(target=server.serve_forever, name='control', daemon=True).start()
+    return server
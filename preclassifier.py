@@ -0,0 +1,198 @@
+"""
+Cheap local sentiment classifier trained on the labels the LLM already produced.
+
+A naive Bayes model over hashed word unigrams and bigrams of the article's clean title
+and description. analyze_articles runs it before the LLM: an article it labels with at
+least `threshold` confidence skips the LLM (label_source 'preclassifier'), the others
+are sent on as usual.
+
+Only rows labeled by the LLM itself are used for training, so the model never learns
+from its own output or from reused results.
+
+Usage:
+
+    python preclassifier.py train    # (re)train from the sentiment table and save the model
+    python preclassifier.py report   # held-out agreement with the LLM, per confidence threshold
+"""
+
+import argparse
+import re
+import sqlite3
+import sys
+import zlib
+from pathlib import Path
+
+# numpy is imported where it's used, so run_pipeline can read DEFAULT_THRESHOLD without loading it
+DEFAULT_MODEL_PATH = Path("preclassifier.npz")
+DEFAULT_THRESHOLD = 0.95
+FEATURE_BITS = 18
+MIN_EXAMPLES = 100
+REPORT_THRESHOLDS = (0.8, 0.9, 0.95, 0.99)
+
+CLASSES = (-1, 0, 1)
+
+
+def features(text):
+    """Returns the distinct hashed unigram and bigram features of the text."""
+    import numpy as np
+    tokens = re.findall(r'\w+', text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    mask = (1 << FEATURE_BITS) - 1
+    return np.unique(np.fromiter((zlib.crc32(gram.encode()) & mask for gram in grams),
+                                 dtype=np.int64, count=len(grams)))
+
+
+def article_text(clean_title, description):
+    return f"{clean_title} {description or ''}"
+
+
+class Preclassifier:
+    def __init__(self, class_log_prior, feature_log_prob, threshold=DEFAULT_THRESHOLD):
+        self.class_log_prior = class_log_prior
+        self.feature_log_prob = feature_log_prob
+        self.threshold = threshold
+        self.lookups = 0
+        self.hits = 0
+
+    @classmethod
+    def train(cls, examples, alpha=1.0):
+        """Fits a multinomial naive Bayes model on binary features of (text, sentiment) examples."""
+        import numpy as np
+        class_index = {sentiment: i for i, sentiment in enumerate(CLASSES)}
+        rows, columns = [], []
+        class_counts = np.zeros(len(CLASSES))
+        for text, sentiment in examples:
+            index = class_index[sentiment]
+            document = features(text)
+            rows.append(np.full(len(document), index))
+            columns.append(document)
+            class_counts[index] += 1
+
+        counts = np.zeros((len(CLASSES), 1 << FEATURE_BITS))
+        if rows:
+            np.add.at(counts, (np.concatenate(rows), np.concatenate(columns)), 1)
+
+        class_log_prior = np.log(class_counts + alpha) - np.log(class_counts.sum() + alpha * len(CLASSES))
+        totals = counts.sum(axis=1, keepdims=True) + alpha * counts.shape[1]
+        feature_log_prob = np.log(counts + alpha) - np.log(totals)
+        return cls(class_log_prior, feature_log_prob.astype(np.float32))
+
+    def predict(self, text):
+        """Returns (sentiment, confidence) for the text."""
+        import numpy as np
+        scores = self.class_log_prior + self.feature_log_prob[:, features(text)].sum(axis=1)
+        probabilities = np.exp(scores - scores.max())
+        probabilities /= probabilities.sum()
+        best = probabilities.argmax()
+        return int(CLASSES[best]), float(probabilities[best])
+
+    def classify(self, clean_title, description):
+        """Returns the article's sentiment if the model is confident enough, otherwise None."""
+        self.lookups += 1
+        sentiment, confidence = self.predict(article_text(clean_title, description))
+        if confidence < self.threshold:
+            return None
+        self.hits += 1
+        return sentiment
+
+    def summary(self):
+        rate = 100 * self.hits / self.lookups if self.lookups else 0
+        return f"{self.hits}/{self.lookups} article(s) labeled without the LLM ({rate:.0f}%)"
+
+    def save(self, path):
+        import numpy as np
+        np.savez_compressed(path, class_log_prior=self.class_log_prior, feature_log_prob=self.feature_log_prob)
+
+    @classmethod
+    def load(cls, path, threshold=DEFAULT_THRESHOLD):
+        import numpy as np
+        with np.load(path) as data:
+            return cls(data['class_log_prior'], data['feature_log_prob'], threshold)
+
+
+def load_examples(conn):
+    """Returns [(key, text, sentiment)] for articles the LLM labeled, one per distinct text."""
+    rows = conn.execute('''
+        SELECT s.source, s.pubDate, s.title, t.clean_title, t.description, s.sentiment
+        FROM sentiment s
+        JOIN item_text t
+        ON s.source = t.source AND s.pubDate = t.pubDate AND s.title = t.title
+        WHERE COALESCE(s.label_source, 'llm') = 'llm' AND s.sentiment IN (-1, 0, 1)
+        GROUP BY t.content_hash
+    ''').fetchall()
+    return [((source, pubDate, title), article_text(clean_title, description), sentiment)
+            for source, pubDate, title, clean_title, description, sentiment in rows]
+
+
+def _is_held_out(key):
+    # Deterministic 80/20 split, so reports are comparable between runs
+    return zlib.crc32("\t".join(key).encode()) % 5 == 0
+
+
+def train(db_path, model_path):
+    conn = sqlite3.connect(db_path)
+    examples = load_examples(conn)
+    conn.close()
+
+    if len(examples) < MIN_EXAMPLES:
+        print(f"Only {len(examples)} LLM-labeled article(s), need at least {MIN_EXAMPLES} to train.")
+        sys.exit(1)
+
+    model = Preclassifier.train((text, sentiment) for _, text, sentiment in examples)
+    model.save(model_path)
+    print(f"Trained on {len(examples)} article(s), saved to {model_path}")
+
+
+def report(db_path):
+    conn = sqlite3.connect(db_path)
+    examples = load_examples(conn)
+    skipped = conn.execute("SELECT COUNT(*) FROM sentiment WHERE label_source = 'preclassifier'").fetchone()[0]
+    conn.close()
+
+    held_out = [(text, sentiment) for key, text, sentiment in examples if _is_held_out(key)]
+    training = [(text, sentiment) for key, text, sentiment in examples if not _is_held_out(key)]
+    if not held_out or len(training) < MIN_EXAMPLES:
+        print(f"Not enough LLM-labeled articles to evaluate ({len(examples)}).")
+        sys.exit(1)
+
+    model = Preclassifier.train(training)
+    predictions = [(model.predict(text), sentiment) for text, sentiment in held_out]
+    agreement = sum(predicted == sentiment for (predicted, _), sentiment in predictions)
+    print(f"Trained on {len(training)}, evaluated on {len(held_out)} LLM-labeled article(s)")
+    print(f"Overall agreement with the LLM: {100 * agreement / len(held_out):.1f}%")
+
+    print("threshold  LLM calls avoided  agreement on those")
+    for threshold in REPORT_THRESHOLDS:
+        confident = [(predicted, sentiment) for (predicted, confidence), sentiment in predictions
+                     if confidence >= threshold]
+        agreed = sum(predicted == sentiment for predicted, sentiment in confident)
+        coverage = 100 * len(confident) / len(held_out)
+        accuracy = f"{100 * agreed / len(confident):.1f}%" if confident else "-"
+        print(f"{threshold:>9}  {coverage:>16.1f}%  {accuracy:>18}")
+
+    print(f"Articles labeled by the pre-classifier so far: {skipped}")
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Train or evaluate the sentiment pre-classifier.")
+    parser.add_argument("command", choices=["train", "report"],
+                        help="train: fit on all LLM labels and save the model; "
+                             "report: agreement with the LLM on held-out articles.")
+    parser.add_argument("--db-path", type=Path, default=Path("rss_storage.sqlite"),
+                        help="Path to the SQLite database file (default: rss_storage.sqlite).")
+    parser.add_argument("--model-path", type=Path, default=DEFAULT_MODEL_PATH,
+                        help=f"Where the trained model is saved (default: {DEFAULT_MODEL_PATH}).")
+    parsed_args = parser.parse_args(args)
+
+    if not parsed_args.db_path.exists():
+        print(f"{parsed_args.db_path} does not exist")
+        sys.exit(1)
+
+    if parsed_args.command == "train":
+        train(parsed_args.db_path, parsed_args.model_path)
+    else:
+        report(parsed_args.db_path)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -12,30 +12,53 @@
 #
 # Can you please provide me with the complete implementation of RSSDownloader?   
 
-import dateparser
 import hashlib
 import os
 import time
 import requests
 import sqlite3
 import sys
+import tempfile
 import xml.etree.ElementTree as ET
 
-from utils import generate_filename
+from http_session import get_session
+from item_archive import append_items, item_key
+from item_text import init_item_text_table, item_text_row, store_item_text
+from utils import ATOM_NS, generate_filename, migrate_pub_ts, pub_timestamp
+
+# (connect, read) timeouts in seconds for feed requests
+DEFAULT_TIMEOUT = (10, 30)
+
+# How long a connection waits on a locked database when several feeds are
+# downloaded concurrently
+DB_LOCK_TIMEOUT = 30
+
+# Feed bodies larger than this are spooled to a temporary file instead of memory
+SPOOL_MAX_SIZE = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# Number of feed items checked and inserted per query
+INSERT_BATCH_SIZE = 500
+
 
 class RSSDownloader:
-    def __init__(self, source_name, source_uri, db_path, raw_storage_path):
+    def __init__(self, source_name, source_uri, db_path, raw_storage_path, timeout=DEFAULT_TIMEOUT,
+                 item_queue=None):
         self.source_name = source_name
         self.source_uri = source_uri
         self.db_path = db_path
         self.raw_storage_path = raw_storage_path
+        self.timeout = timeout
+        # If set, ((source, pubDate, title), fetched_at) of each new item is put on it once committed
+        self.item_queue = item_queue
+        self._fetched_state = None
 
         os.makedirs(os.path.join(self.raw_storage_path, self.source_name), exist_ok=True)
         self._initialize_db()
 
     def _initialize_db(self):
         """Creates the SQLite table if it doesn't exist."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, timeout=DB_LOCK_TIMEOUT) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS rss_items (
@@ -43,25 +66,106 @@ class RSSDownloader:
                     pubDate TEXT,
                     title TEXT,
                     link TEXT,
+                    pub_ts INTEGER,  -- pubDate as UTC epoch seconds
                     PRIMARY KEY (source, pubDate, title)
                 )
             ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS feed_state (
+                    source TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body_hash TEXT,
+                    checked_at TEXT
+                )
+            ''')
+            init_item_text_table(conn)
             conn.commit()
+            migrate_pub_ts(conn)
+
+    def _load_feed_state(self):
+        """Returns (etag, last_modified, body_hash) stored for this source from the previous run."""
+        with sqlite3.connect(self.db_path, timeout=DB_LOCK_TIMEOUT) as conn:
+            row = conn.execute(
+                'SELECT etag, last_modified, body_hash FROM feed_state WHERE source = ?',
+                (self.source_name,)
+            ).fetchone()
+        return row if row else (None, None, None)
+
+    def _save_feed_state(self, conn, etag, last_modified, body_hash):
+        conn.execute('''
+            INSERT OR REPLACE INTO feed_state (source, etag, last_modified, body_hash, checked_at)
+            VALUES (?, ?, ?, ?, datetime('now'))
+        ''', (self.source_name, etag, last_modified, body_hash))
 
 
     def _fetch_rss_feed(self, url):
-        """Fetch the RSS feed from the given URL and return the XML payload."""
+        """
+        Fetch the RSS feed from the given URL and return a file object holding the XML payload.
+
+        The body is streamed into a spooled temporary file (hashed on the way) rather than
+        decoded into a string. Sends the validators saved by the previous run, so returns
+        None when the server answers 304 Not Modified or the body hashes the same as last
+        time. The new validators are kept in self._fetched_state until the items are stored.
+        """
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/86.0.4240.183 Safari/537.36'
-        }    
+        }
+        etag, last_modified, body_hash = self._load_feed_state()
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        feed_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        hasher = hashlib.sha256()
         try:
             print(f"Fetching the RSS feed from {url}...")
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()  # Raises an error for bad status codes
-            return response.text
+            with get_session().get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304:
+                    feed_file.close()
+                    return None
+                response.raise_for_status()  # Raises an error for bad status codes
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    hasher.update(chunk)
+                    feed_file.write(chunk)
+                new_state = (response.headers.get('ETag'), response.headers.get('Last-Modified'), hasher.hexdigest())
         except requests.RequestException as e:
+            feed_file.close()
             raise RuntimeError(f"Failed to fetch RSS feed: {e}")
 
+        self._fetched_state = new_state
+        if new_state[2] == body_hash:
+            feed_file.close()
+            with sqlite3.connect(self.db_path, timeout=DB_LOCK_TIMEOUT) as conn:
+                self._save_feed_state(conn, *self._fetched_state)
+            return None
+
+        feed_file.seek(0)
+        return feed_file
+
+
+    def _iter_feed_items(self, feed_file):
+        """
+        Incrementally parses the feed, yielding RSS ./channel/item or Atom entry elements.
+
+        Each element is cleared and detached from its parent once the caller moves on to
+        the next one, so only a single item is held in memory at a time.
+        """
+        stack = []
+        for event, elem in ET.iterparse(feed_file, events=('start', 'end')):
+            if event == 'start':
+                stack.append(elem)
+                continue
+
+            stack.pop()
+            is_rss_item = elem.tag == 'item' and len(stack) == 2 and stack[1].tag == 'channel'
+            is_atom_entry = elem.tag == ATOM_NS + 'entry' and len(stack) == 1
+            if is_rss_item or is_atom_entry:
+                yield elem
+                elem.clear()
+                stack[-1].remove(elem)
+
 
     def _get_item_text(self, item, sub_item_key, default_value):
         sub_item = item.find(sub_item_key)
@@ -70,40 +174,120 @@ class RSSDownloader:
         else:
             return sub_item.text
 
+    def _get_item_metadata(self, item):
+        """Returns (title, pubDate, link) for an RSS item or Atom entry."""
+        if item.tag != ATOM_NS + 'entry':
+            return (self._get_item_text(item, 'title', None),
+                    self._get_item_text(item, 'pubDate', None),
+                    self._get_item_text(item, 'link', None))
+
+        title = self._get_item_text(item, ATOM_NS + 'title', None)
+        pubDate = self._get_item_text(item, ATOM_NS + 'published', None) or \
+            self._get_item_text(item, ATOM_NS + 'updated', None)
+        link = None
+        for link_elem in item.findall(ATOM_NS + 'link'):
+            if link_elem.get('rel', 'alternate') == 'alternate':
+                link = link_elem.get('href')
+                break
+        return title, pubDate, link
+
 
     def download_items(self):
-        """Fetches RSS items, stores metadata in SQLite, and saves individual XML files."""
-        raw_feed = self._fetch_rss_feed(self.source_uri)
-        feed_root = ET.fromstring(raw_feed)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            for item in feed_root.findall('./channel/item'):
-                title = self._get_item_text(item, 'title', None)
-                pubDate = self._get_item_text(item, 'pubDate', None)
-                link = self._get_item_text(item, 'link', None)
-                
+        """
+        Fetches RSS items, stores metadata in SQLite, and saves individual XML files.
+
+        Items are inserted in batches within a single transaction: each batch's keys are
+        checked against rss_items in one query, only the new rows are inserted (with
+        executemany) and only their XML files are written.
+        """
+        feed_file = self._fetch_rss_feed(self.source_uri)
+        fetched_at = time.monotonic()
+        if feed_file is None:
+            print(f"Feed {self.source_name} unchanged since last run, skipping.")
+            return
+
+        new_items = []
+        with feed_file, sqlite3.connect(self.db_path, timeout=DB_LOCK_TIMEOUT) as conn:
+            seen = set()
+            batch = []
+            for item in self._iter_feed_items(feed_file):
+                title, pubDate, link = self._get_item_metadata(item)
+
                 if not pubDate or not title or not link:
                     continue  # Skip incomplete entries
-                
+
                 try:
-                    cursor.execute('INSERT INTO rss_items (source, pubDate, title, link) VALUES (?, ?, ?, ?)', (self.source_name, pubDate, title, link))
-                    conn.commit()
-                except sqlite3.IntegrityError:
-                    continue  # Avoid duplicate storage
-                
-                # Save full RSS entry as an XML file
-                filename = generate_filename(title, pubDate)
-                file_path = os.path.join(self.raw_storage_path, self.source_name, filename)
-                self._save_entry_as_xml(file_path, item)
+                    filename = generate_filename(title, pubDate)
+                except (AttributeError, ValueError):
+                    print(f"Skipping item with unparseable pubDate '{pubDate}': {title}")
+                    continue
+
+                # Serialize now so the parser can release the element
+                xml_bytes = ET.tostring(item, encoding='utf-8', xml_declaration=True)
+                batch.append((pubDate, title, link, filename, xml_bytes))
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    new_items += self._store_batch(conn, batch, seen)
+                    batch = []
+
+            new_items += self._store_batch(conn, batch, seen)
+
+            # Only remember the validators once every item has been stored
+            self._save_feed_state(conn, *self._fetched_state)
+            conn.commit()
+
+        if self.item_queue is not None:
+            for pubDate, title in new_items:
+                self.item_queue.put(((self.source_name, pubDate, title), fetched_at))
 
-    def _save_entry_as_xml(self, file_path, item):
-        """Writes the RSS entry as an XML file."""
-        tree = ET.ElementTree(item)
-        tree.write(file_path, encoding='utf-8', xml_declaration=True)
+    def _store_batch(self, conn, batch, seen):
+        """
+        Inserts the batch's items that aren't stored yet, with their analysis text, and writes their XML files.
+
+        Returns the (pubDate, title) of the inserted items.
+        """
+        if not batch:
+            return []
+
+        placeholders = ', '.join('?' * len(batch))
+        rows = conn.execute(
+            f'SELECT pubDate, title FROM rss_items WHERE source = ? AND pubDate IN ({placeholders})',
+            [self.source_name] + [pubDate for pubDate, *_ in batch]
+        )
+        seen.update(rows)
+
+        new_items = []
+        for pubDate, title, link, filename, xml_bytes in batch:
+            if (pubDate, title) in seen:
+                continue  # Avoid duplicate storage
+            seen.add((pubDate, title))
+            new_items.append((pubDate, title, link, filename, xml_bytes))
+
+        conn.executemany(
+            'INSERT INTO rss_items (source, pubDate, title, link, pub_ts) VALUES (?, ?, ?, ?, ?)',
+            [(self.source_name, pubDate, title, link, pub_timestamp(pubDate))
+             for pubDate, title, link, _, _ in new_items]
+        )
+        store_item_text(conn, [item_text_row(self.source_name, pubDate, title, ET.fromstring(xml_bytes))
+                               for pubDate, title, _, _, xml_bytes in new_items])
+
+        # Save full RSS entries as XML files
+        for _, _, _, filename, xml_bytes in new_items:
+            file_path = os.path.join(self.raw_storage_path, self.source_name, filename)
+            self._save_entry_as_xml(file_path, xml_bytes)
+
+        return [(pubDate, title) for pubDate, title, _, _, _ in new_items]
+
+    def _save_entry_as_xml(self, file_path, xml_bytes):
+        """Writes the serialized RSS entry as an XML file."""
+        with open(file_path, 'wb') as f:
+            f.write(xml_bytes)
 
     def archive_old_items(self):
-        """Archives monthly items into a larger XML file and removes original files."""
+        """
+        Appends items older than a month to their monthly archive and removes the original files.
+
+        Only the new files are read; see item_archive for the segment and index format.
+        """
         archive_dir = os.path.join(self.raw_storage_path, "archives", self.source_name)
         os.makedirs(archive_dir, exist_ok=True)
         
@@ -121,16 +305,11 @@ class RSSDownloader:
                 files_by_month.setdefault(month_key, []).append(file_path)
         
         for month, files in files_by_month.items():
-            archive_filename = f"archive_{month}.xml"
-            archive_path = os.path.join(archive_dir, archive_filename)
-
-            root = ET.Element("rss_archive")
+            items = []
             for file_path in files:
-                tree = ET.parse(file_path)
-                root.append(tree.getroot())
-
-            archive_tree = ET.ElementTree(root)
-            archive_tree.write(archive_path, encoding='utf-8', xml_declaration=True)
+                with open(file_path, 'rb') as f:
+                    items.append((item_key(os.path.basename(file_path)), f.read()))
+            append_items(archive_dir, month, items)
 
             # Delete individual files after archiving
             for file_path in files:
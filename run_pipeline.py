@@ -3,6 +3,11 @@ Pipeline orchestrator: download feeds → analyze articles → send digest.
 
 Designed to run on a schedule (e.g., Windows Task Scheduler every 2 hours).
 - Skips LLM analysis if GPU utilization exceeds the threshold.
+- Keeps watching the load during analysis and pauses, slows down or stops it while
+  other programs need the machine (see load_probe).
+- With --streaming, analyzes items while the feeds are still downloading.
+- With --daemon, stays resident and runs cycles on its own schedule, keeping the LLM
+  server and model loaded in between (see pipeline_daemon).
 - Uses a lockfile so concurrent instances exit cleanly without fighting.
 - Shows a tray icon while running (green → yellow if GPU busy, red on error).
 - Logs all output to pipeline.log alongside a console echo.
@@ -11,14 +16,19 @@ Designed to run on a schedule (e.g., Windows Task Scheduler every 2 hours).
 import argparse
 import logging
 import os
-import subprocess
+import queue
 import sys
+import threading
+import time
 from pathlib import Path
 
-import psutil
-
+from load_probe import (DEFAULT_INTERVAL, LLM_PROCESSES, MODES, CpuProbe, MemoryProbe, NvidiaSmiProbe,
+                        Throttle)
 from tray_icon import TrayIcon
 
+# Max downloaded items waiting for analysis in streaming mode; downloads wait when it's full
+STREAM_QUEUE_SIZE = 1000
+
 # ---------------------------------------------------------------------------
 # Logging – write to pipeline.log AND stdout
 # ---------------------------------------------------------------------------
@@ -47,6 +57,7 @@ class Lockfile:
 
     def acquire(self) -> bool:
         if self.path.exists():
+            import psutil
             try:
                 pid = int(self.path.read_text().strip())
                 if psutil.pid_exists(pid):
@@ -64,93 +75,120 @@ class Lockfile:
 
 
 # ---------------------------------------------------------------------------
-# GPU check
+# Load checks
 # ---------------------------------------------------------------------------
 
-def _gpu_utilization() -> int | None:
-    """Returns GPU utilization percentage (0-100), or None if unavailable."""
-    try:
-        result = subprocess.run(
-            ['nvidia-smi', '--query-gpu=utilization.gpu',
-             '--format=csv,noheader,nounits'],
-            capture_output=True, text=True, timeout=5
-        )
-        if result.returncode == 0:
-            values = [int(v.strip()) for v in result.stdout.strip().splitlines() if v.strip().isdigit()]
-            return max(values) if values else None
-    except (FileNotFoundError, subprocess.TimeoutExpired, ValueError):
-        pass
-    return None
-
-
-def _gpu_is_busy(threshold: int) -> bool:
-    util = _gpu_utilization()
-    if util is None:
-        return False  # nvidia-smi not available — assume free
-    return util > threshold
+def _make_throttle(mode: str, gpu_threshold: int, cpu_threshold: int | None,
+                   memory_threshold: int | None, interval: float) -> Throttle | None:
+    """Builds the throttle consulted during analysis, or None if throttling is off."""
+    if mode == 'off':
+        return None
+    # The LLM server's own GPU load doesn't count
+    limits = [(NvidiaSmiProbe(exclude_processes=LLM_PROCESSES), gpu_threshold)]
+    if cpu_threshold is not None:
+        limits.append((CpuProbe(), cpu_threshold))
+    if memory_threshold is not None:
+        limits.append((MemoryProbe(), memory_threshold))
+    return Throttle(limits, mode=mode, interval=interval)
 
 
 # ---------------------------------------------------------------------------
 # Pipeline steps (thin wrappers around each script's main())
 # ---------------------------------------------------------------------------
 
-def _step_download(feeds_file: str, db_path: Path, raw_storage_path: Path, logger):
-    logger.info("Step 1/3: Downloading feeds from %s", feeds_file)
-    from download_feeds import main as download_main
-
-    # download_feeds.main() uses hardcoded paths; we patch them via env-style
-    # override by monkey-patching RSSDownloader's defaults.
-    import rss_downloader as _rsd
-    _orig_init = _rsd.RSSDownloader.__init__
-
-    def _patched_init(self, source_name, source_uri, db_path=None, raw_storage_path=None):
-        _orig_init(self, source_name, source_uri,
-                   str(db_path) if db_path else str(db_path),
-                   str(raw_storage_path) if raw_storage_path else str(raw_storage_path))
-
-    # download_feeds calls RSSDownloader with its own hardcoded paths; we need
-    # to call it differently. Parse the yaml ourselves and call RSSDownloader
-    # with the correct paths.
+def _step_download(feeds_file: str, db_path: Path, raw_storage_path: Path, logger,
+                   workers: int, per_host: int, timeout: tuple, item_queue: queue.Queue | None = None):
+    logger.info("Step 1/3: Downloading feeds from %s (%d workers, %d per host)",
+                feeds_file, workers, per_host)
     import yaml
-    from rss_downloader import RSSDownloader
+    from download_feeds import download_feeds
 
     with open(feeds_file) as f:
         feeds = yaml.safe_load(f)
 
-    for feed in feeds:
-        name = feed['name']
-        url = feed['url']
-        try:
-            dl = RSSDownloader(
-                source_name=name,
-                source_uri=url,
-                db_path=str(db_path),
-                raw_storage_path=str(raw_storage_path),
-            )
-            dl.download_items()
-            dl.archive_old_items()
-            logger.info("  Downloaded: %s", name)
-        except Exception as e:
-            logger.warning("  Failed to download %s: %s", name, e)
-
-
-def _step_analyze(runtime: str, db_path: Path, raw_storage_path: Path, logger):
-    logger.info("Step 2/3: Analyzing articles with runtime=%s", runtime)
-    from analyze_articles import analyze_articles
+    results = download_feeds(feeds, str(db_path), str(raw_storage_path),
+                             workers=workers, per_host=per_host, timeout=timeout, item_queue=item_queue)
+    for feed, error in results:
+        if error is None:
+            logger.info("  Downloaded: %s", feed['name'])
+        else:
+            logger.warning("  Failed to download %s: %s", feed['name'], error)
+
+
+def _make_client(runtime: str, concurrency: int, llm_timeout: float, resident: bool = False):
     from ollama_wrapper import OllamaWrapper
     from llama_cpp_wrapper import LlamaCppWrapper
 
     MODEL_NAME = 'llama3.2'
     if runtime == 'ollama':
-        client = OllamaWrapper(MODEL_NAME)
-    else:
-        client = LlamaCppWrapper()
+        # A resident daemon keeps the model loaded between cycles
+        options = {'keep_alive': -1} if resident else {}
+        return OllamaWrapper(MODEL_NAME, num_parallel=concurrency, timeout=llm_timeout, **options)
+    return LlamaCppWrapper(parallel=concurrency, timeout=llm_timeout)
+
+
+def _step_analyze(runtime: str, db_path: Path, raw_storage_path: Path, logger,
+                  concurrency: int, batch_size: int, llm_timeout: float, fast: bool,
+                  preclassifier_path: Path, preclassifier_threshold: float,
+                  max_seconds: float, max_items: int, fair: bool,
+                  feeds_file: str, throttle: Throttle | None, item_queue: queue.Queue | None = None,
+                  client=None):
+    """Analyzes pending articles; a given `client` is left running afterwards (daemon mode)."""
+    logger.info("Step 2/3: Analyzing articles with runtime=%s (concurrency %d, batch size %d%s)",
+                runtime, concurrency, batch_size, ', labels only' if fast else '')
+    from analyze_articles import analyze_articles, explain_digest_items, load_source_weights
+
+    own_client = client is None
+    if own_client:
+        client = _make_client(runtime, concurrency, llm_timeout)
+
+    preclassifier = None
+    if preclassifier_path:
+        from preclassifier import Preclassifier
+        preclassifier = Preclassifier.load(preclassifier_path, preclassifier_threshold)
 
     try:
-        client.start()
-        analyze_articles(client, str(raw_storage_path), str(db_path))
+        client.start()  # quick if the server is already up with the model loaded
+        started = time.monotonic()
+        analyze_articles(client, str(raw_storage_path), str(db_path),
+                         concurrency=concurrency, batch_size=batch_size, fast=fast,
+                         preclassifier=preclassifier, max_seconds=max_seconds, max_items=max_items,
+                         fair=fair, source_weights=load_source_weights(feeds_file) if fair else None,
+                         throttle=throttle, item_queue=item_queue)
+        if fast or preclassifier:
+            # Explanations share the analysis budget, so the digest still goes out on time
+            remaining = max_seconds - (time.monotonic() - started) if max_seconds else None
+            explain_digest_items(client, str(db_path), concurrency=concurrency, max_seconds=remaining)
     finally:
-        client.stop()
+        if own_client:
+            client.stop()
+
+
+def _step_stream(download_args: tuple, download_options: tuple, analyze_args: tuple, logger, client=None):
+    """Downloads feeds in a background thread while the items are analyzed as they arrive."""
+    item_queue = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+
+    def produce():
+        try:
+            _step_download(*download_args, logger, *download_options, item_queue=item_queue)
+        except Exception:
+            logger.exception('Download failed')
+        finally:
+            item_queue.put(None)
+
+    producer = threading.Thread(target=produce, name='download', daemon=True)
+    producer.start()  # downloads overlap with the LLM server starting up
+    try:
+        _step_analyze(*analyze_args, item_queue=item_queue, client=client)
+    finally:
+        # Analysis may stop early (budget, throttle, error): keep the downloads from blocking on
+        # a full queue. Items dropped here are analyzed by the next run.
+        while producer.is_alive():
+            try:
+                item_queue.get(timeout=1)
+            except queue.Empty:
+                pass
+        producer.join()
 
 
 def _step_digest(to: str, db_path: Path, logger):
@@ -159,11 +197,89 @@ def _step_digest(to: str, db_path: Path, logger):
     digest_main(['--to', to, '--db-path', str(db_path)])
 
 
+# ---------------------------------------------------------------------------
+# Cycles
+# ---------------------------------------------------------------------------
+
+def _run_cycle(parsed, logger, icon, client=None) -> bool:
+    """Runs download → analyze → digest once; returns whether analysis was skipped because the GPU was busy."""
+    download_args = (parsed.feeds_file, parsed.db_path, parsed.raw_storage_path)
+    download_options = (parsed.download_workers, parsed.per_host,
+                        (parsed.connect_timeout, parsed.read_timeout))
+    analyze_args = (parsed.runtime, parsed.db_path, parsed.raw_storage_path, logger,
+                    parsed.analysis_concurrency, parsed.analysis_batch_size, parsed.llm_timeout,
+                    parsed.fast_analysis, parsed.preclassifier, parsed.preclassifier_threshold,
+                    parsed.analysis_max_seconds, parsed.analysis_max_items, parsed.analysis_fair,
+                    parsed.feeds_file,
+                    None if parsed.force else _make_throttle(
+                        parsed.throttle, parsed.gpu_threshold, parsed.cpu_threshold,
+                        parsed.memory_threshold, parsed.throttle_interval))
+
+    if not parsed.streaming:
+        _step_download(*download_args, logger, *download_options)
+
+    gpu_skipped = False
+    util = None if parsed.force else NvidiaSmiProbe().sample()
+    if util is not None and util > parsed.gpu_threshold:
+        logger.warning('GPU utilization is %s%% (threshold %s%%) — skipping analysis.',
+                       util, parsed.gpu_threshold)
+        icon.set_gpu_skipped()
+        gpu_skipped = True
+        if parsed.streaming:
+            _step_download(*download_args, logger, *download_options)
+    elif parsed.streaming:
+        _step_stream(download_args, download_options, analyze_args, logger, client=client)
+    else:
+        _step_analyze(*analyze_args, client=client)
+
+    if not parsed.skip_email:
+        _step_digest(parsed.to, parsed.db_path, logger)
+    else:
+        logger.info('Step 3/3: Skipped (--skip-email)')
+    return gpu_skipped
+
+
+def _run_daemon(parsed, logger, icon):
+    """Runs cycles every --interval minutes with a resident LLM client, until stopped."""
+    from pipeline_daemon import PipelineDaemon, serve_control
+
+    client = _make_client(parsed.runtime, parsed.analysis_concurrency, parsed.llm_timeout, resident=True)
+
+    def cycle():
+        logger.info('=== Pipeline cycle started ===')
+        icon.set_running()
+        try:
+            gpu_skipped = _run_cycle(parsed, logger, icon, client)
+        except Exception:
+            icon.set_error()
+            raise
+        logger.info('=== Pipeline cycle finished%s ===',
+                    ' (analysis skipped: GPU busy)' if gpu_skipped else '')
+
+    daemon = PipelineDaemon(cycle, parsed.interval * 60, logger)
+    server = serve_control(daemon, parsed.control_port)
+    logger.info('Daemon started: a cycle every %s minutes, control endpoint on http://127.0.0.1:%d',
+                parsed.interval, parsed.control_port)
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        logger.info('Interrupted')
+    finally:
+        server.shutdown()
+        client.stop()
+    logger.info('=== Daemon stopped ===')
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
 def main(args):
+    from download_feeds import DEFAULT_PER_HOST, DEFAULT_WORKERS
+    from llm_wrapper import DEFAULT_TIMEOUT as LLM_TIMEOUT
+    from preclassifier import DEFAULT_THRESHOLD
+    from rss_downloader import DEFAULT_TIMEOUT as FEED_TIMEOUT
+
     parser = argparse.ArgumentParser(description='Run the better-news pipeline.')
     parser.add_argument('--feeds-file', required=True, help='Path to feeds YAML file')
     parser.add_argument('--runtime', choices=['ollama', 'llama_cpp'], required=True)
@@ -172,10 +288,54 @@ def main(args):
     parser.add_argument('--raw-storage-path', type=Path, default=Path('rss_raw_data'))
     parser.add_argument('--gpu-threshold', type=int, default=20,
                         help='Skip analysis if GPU util%% exceeds this (default: 20)')
+    parser.add_argument('--throttle', choices=('off',) + MODES, default='pause',
+                        help='What to do when the load rises during analysis: pause, slow down to one '
+                             'prompt at a time, or drain in-flight prompts and stop (default: pause)')
+    parser.add_argument('--cpu-threshold', type=int,
+                        help='Also throttle analysis while CPU%% exceeds this (default: off)')
+    parser.add_argument('--memory-threshold', type=int,
+                        help='Also throttle analysis while memory use%% exceeds this (default: off)')
+    parser.add_argument('--throttle-interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f'Seconds between load samples during analysis (default: {DEFAULT_INTERVAL})')
     parser.add_argument('--skip-email', action='store_true',
                         help='Run download + analysis but skip the digest email')
     parser.add_argument('--force', action='store_true',
-                        help='Bypass GPU check and run analysis regardless')
+                        help='Bypass GPU check and load throttling, and run analysis regardless')
+    parser.add_argument('--download-workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Max feeds downloaded at once (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                        help=f'Max concurrent connections per feed host (default: {DEFAULT_PER_HOST})')
+    parser.add_argument('--connect-timeout', type=float, default=FEED_TIMEOUT[0],
+                        help=f'Feed connect timeout in seconds (default: {FEED_TIMEOUT[0]})')
+    parser.add_argument('--read-timeout', type=float, default=FEED_TIMEOUT[1],
+                        help=f'Feed read timeout in seconds (default: {FEED_TIMEOUT[1]})')
+    parser.add_argument('--analysis-concurrency', type=int, default=1,
+                        help='Number of prompts sent in parallel (default: 1)')
+    parser.add_argument('--analysis-batch-size', type=int, default=1,
+                        help='Articles classified per prompt (default: 1)')
+    parser.add_argument('--llm-timeout', type=float, default=LLM_TIMEOUT,
+                        help=f'Seconds allowed for a single LLM request (default: {LLM_TIMEOUT})')
+    parser.add_argument('--analysis-max-seconds', type=float,
+                        help='Stop starting new analysis work after this many seconds (default: no limit)')
+    parser.add_argument('--analysis-max-items', type=int,
+                        help='Analyze at most this many articles per run (default: no limit)')
+    parser.add_argument('--analysis-fair', action='store_true',
+                        help="Let sources take turns (feeds with a 'weight' get that many items per turn)")
+    parser.add_argument('--preclassifier', type=Path,
+                        help='Trained pre-classifier model; confidently labeled articles skip the LLM')
+    parser.add_argument('--preclassifier-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Minimum pre-classifier confidence for an article to skip the LLM '
+                             f'(default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--fast-analysis', action='store_true',
+                        help='Only generate sentiment labels; explain just the items headed for the digest')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Analyze articles as they are downloaded instead of after all feeds are done')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Stay resident and run the pipeline every --interval minutes, keeping the model loaded')
+    parser.add_argument('--interval', type=float, default=120,
+                        help='Minutes between the end of a daemon cycle and the start of the next (default: 120)')
+    parser.add_argument('--control-port', type=int, default=8765,
+                        help='Localhost port of the daemon control endpoint (default: 8765)')
     parser.add_argument('--log-path', type=Path, default=Path('pipeline.log'))
     parser.add_argument('--lock-path', type=Path, default=Path('pipeline.lock'))
     parsed = parser.parse_args(args)
@@ -189,29 +349,15 @@ def main(args):
         sys.exit(0)
 
     icon.start()
-    gpu_skipped = False
 
     try:
-        logger.info('=== Pipeline started ===')
-
-        _step_download(parsed.feeds_file, parsed.db_path, parsed.raw_storage_path, logger)
-
-        if not parsed.force and _gpu_is_busy(parsed.gpu_threshold):
-            util = _gpu_utilization()
-            logger.warning('GPU utilization is %s%% (threshold %s%%) — skipping analysis.',
-                           util, parsed.gpu_threshold)
-            icon.set_gpu_skipped()
-            gpu_skipped = True
-        else:
-            _step_analyze(parsed.runtime, parsed.db_path, parsed.raw_storage_path, logger)
-
-        if not parsed.skip_email:
-            _step_digest(parsed.to, parsed.db_path, logger)
+        if parsed.daemon:
+            _run_daemon(parsed, logger, icon)
         else:
-            logger.info('Step 3/3: Skipped (--skip-email)')
-
-        logger.info('=== Pipeline finished%s ===',
-                    ' (analysis skipped: GPU busy)' if gpu_skipped else '')
+            logger.info('=== Pipeline started ===')
+            gpu_skipped = _run_cycle(parsed, logger, icon)
+            logger.info('=== Pipeline finished%s ===',
+                        ' (analysis skipped: GPU busy)' if gpu_skipped else '')
 
     except Exception as e:
         logger.exception('Pipeline error: %s', e)
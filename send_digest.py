@@ -4,9 +4,8 @@ import sys
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
-import dateparser
-
 from mailer import authenticate_gmail, send_email
+from utils import migrate_pub_ts
 
 BATCH_SIZE = 50
 BOOTSTRAP_DAYS = 7
@@ -32,27 +31,31 @@ def is_first_run(conn):
 
 def fetch_unread_positives(conn, bootstrap_cutoff=None):
     """Returns all positive-sentiment items not yet sent, sorted oldest-first."""
+    cutoff_ts = int(bootstrap_cutoff.timestamp()) if bootstrap_cutoff else None
     rows = conn.execute('''
-        SELECT r.source, r.pubDate, r.title, r.link
+        SELECT r.source, r.pubDate, r.title, r.link, r.pub_ts
         FROM rss_items r
         JOIN sentiment s
             ON r.source = s.source AND r.pubDate = s.pubDate AND r.title = s.title
         LEFT JOIN sent_items si
             ON r.source = si.source AND r.pubDate = si.pubDate AND r.title = si.title
         WHERE s.sentiment = 1 AND si.source IS NULL
-    ''').fetchall()
+            AND r.pub_ts IS NOT NULL AND (:cutoff IS NULL OR r.pub_ts >= :cutoff)
+        ORDER BY r.pub_ts
+    ''', {'cutoff': cutoff_ts}).fetchall()
 
-    items = []
-    for source, pubDate, title, link in rows:
-        parsed = dateparser.parse(pubDate, settings={'RETURN_AS_TIMEZONE_AWARE': True})
-        if parsed is None:
-            continue
-        if bootstrap_cutoff and parsed < bootstrap_cutoff:
-            continue
-        items.append((parsed, source, pubDate, title, link))
+    # pub_ts rather than the pubDate string: always timezone-aware, so batches sort and compare
+    return [(datetime.fromtimestamp(pub_ts, timezone.utc), source, pubDate, title, link)
+            for source, pubDate, title, link, pub_ts in rows]
 
-    items.sort(key=lambda x: x[0])
-    return items
+
+def fetch_digest_items(conn):
+    """Returns the items the next digest will contain (fetch_unread_positives, bootstrap-limited on a first run)."""
+    bootstrap_cutoff = None
+    if is_first_run(conn):
+        bootstrap_cutoff = datetime.now(timezone.utc) - timedelta(days=BOOTSTRAP_DAYS)
+        print(f"First run — limiting to items from the last {BOOTSTRAP_DAYS} days.")
+    return fetch_unread_positives(conn, bootstrap_cutoff)
 
 
 def build_email_body(batch):
@@ -96,57 +99,64 @@ def mark_sent(conn, batch, sent_at):
     conn.commit()
 
 
-def main(args):
-    parser = argparse.ArgumentParser(description="Send positive news digest emails.")
-    parser.add_argument('--to', required=True, help='Recipient email address')
-    parser.add_argument('--db-path', type=Path, default=Path('rss_storage.sqlite'))
-    parser.add_argument('--max-items', type=int, default=BATCH_SIZE,
-                        help=f'Max items per email batch (default: {BATCH_SIZE})')
-    parser.add_argument('--dry-run', action='store_true',
-                        help='Print digest without sending')
-    parsed = parser.parse_args(args)
-
-    if not parsed.db_path.exists():
-        print(f"Database not found: {parsed.db_path}")
-        sys.exit(1)
-
-    conn = sqlite3.connect(parsed.db_path)
-    init_sent_items_table(conn)
-
-    bootstrap_cutoff = None
-    if is_first_run(conn):
-        bootstrap_cutoff = datetime.now(timezone.utc) - timedelta(days=BOOTSTRAP_DAYS)
-        print(f"First run — limiting to items from the last {BOOTSTRAP_DAYS} days.")
+def send_digest(conn, to, max_items=BATCH_SIZE, dry_run=False, service=None):
+    """
+    Emails the pending digest items in batches of `max_items` and marks them sent.
 
-    items = fetch_unread_positives(conn, bootstrap_cutoff)
+    `service` is the Gmail API service; authenticate_gmail() is called if it's not
+    given and there is something to send. Returns the number of items sent.
+    """
+    items = fetch_digest_items(conn)
 
     if not items:
         print("No new positive items to send.")
-        conn.close()
-        return
+        return 0
 
     # Split into batches
-    batches = [items[i:i + parsed.max_items] for i in range(0, len(items), parsed.max_items)]
+    batches = [items[i:i + max_items] for i in range(0, len(items), max_items)]
     total_batches = len(batches)
     print(f"Found {len(items)} item(s) across {total_batches} email(s).")
 
-    service = None if parsed.dry_run else authenticate_gmail()
+    if service is None and not dry_run:
+        service = authenticate_gmail()
     sent_at = datetime.now(timezone.utc).isoformat()
 
+    sent = 0
     for i, batch in enumerate(batches, 1):
         subject = subject_for_batch(batch, i, total_batches)
         plain, html = build_email_body(batch)
 
-        if parsed.dry_run:
+        if dry_run:
             print(f"\n--- DRY RUN: Email {i}/{total_batches} ---")
             print(f"Subject: {subject}")
             print(plain)
             continue
 
-        send_email(service, parsed.to, subject, plain, html)
+        send_email(service, to, subject, plain, html)
         mark_sent(conn, batch, sent_at)
+        sent += len(batch)
         print(f"Sent batch {i}/{total_batches}: {subject}")
+    return sent
 
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Send positive news digest emails.")
+    parser.add_argument('--to', required=True, help='Recipient email address')
+    parser.add_argument('--db-path', type=Path, default=Path('rss_storage.sqlite'))
+    parser.add_argument('--max-items', type=int, default=BATCH_SIZE,
+                        help=f'Max items per email batch (default: {BATCH_SIZE})')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Print digest without sending')
+    parsed = parser.parse_args(args)
+
+    if not parsed.db_path.exists():
+        print(f"Database not found: {parsed.db_path}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(parsed.db_path)
+    init_sent_items_table(conn)
+    migrate_pub_ts(conn)
+    send_digest(conn, parsed.to, max_items=parsed.max_items, dry_run=parsed.dry_run)
     conn.close()
 
 
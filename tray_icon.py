@@ -5,6 +5,7 @@ States: RUNNING (green), GPU_SKIPPED (yellow), ERROR (red).
 Usage:
     icon = TrayIcon()
     icon.start()          # show green icon in tray
+    icon.set_running()     # back to green (between runs of the daemon)
     icon.set_gpu_skipped() # turn yellow
     icon.set_error()       # turn red
     icon.stop()           # remove from tray
@@ -13,12 +14,8 @@ Usage:
 import platform
 import threading
 
-try:
-    from PIL import Image, ImageDraw
-    import pystray
-    _TRAY_AVAILABLE = True
-except ImportError:
-    _TRAY_AVAILABLE = False
+# Pillow and pystray are only imported by start(), so importing this module stays cheap
+Image = ImageDraw = pystray = None
 
 _COLOR_RUNNING = (76, 175, 80)      # green
 _COLOR_GPU_SKIPPED = (255, 193, 7)  # amber
@@ -26,6 +23,14 @@ _COLOR_ERROR = (244, 67, 54)        # red
 _ICON_SIZE = 64
 
 
+def _import_tray():
+    """Imports Pillow and pystray; raises ImportError if they aren't installed."""
+    global Image, ImageDraw, pystray
+    if pystray is None:
+        from PIL import Image, ImageDraw
+        import pystray
+
+
 def _make_icon_image(color):
     img = Image.new('RGBA', (_ICON_SIZE, _ICON_SIZE), (0, 0, 0, 0))
     draw = ImageDraw.Draw(img)
@@ -41,7 +46,7 @@ class TrayIcon:
     def __init__(self):
         self._icon = None
         self._thread = None
-        self._available = _TRAY_AVAILABLE and platform.system() in ('Windows', 'Darwin', 'Linux')
+        self._available = platform.system() in ('Windows', 'Darwin', 'Linux')
 
     def _make_pystray_icon(self, color, title):
         return pystray.Icon(
@@ -53,6 +58,11 @@ class TrayIcon:
     def start(self):
         if not self._available:
             return
+        try:
+            _import_tray()
+        except ImportError:
+            self._available = False
+            return
         self._icon = self._make_pystray_icon(_COLOR_RUNNING, 'Better News: running')
         self._thread = threading.Thread(target=self._icon.run, daemon=True)
         self._thread.start()
@@ -63,6 +73,9 @@ class TrayIcon:
         self._icon.icon = _make_icon_image(color)
         self._icon.title = title
 
+    def set_running(self):
+        self._update(_COLOR_RUNNING, 'Better News: running')
+
     def set_gpu_skipped(self):
         self._update(_COLOR_GPU_SKIPPED, 'Better News: GPU busy, analysis skipped')
 
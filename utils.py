@@ -1,10 +1,92 @@
-import dateparser
 import hashlib
+import re
 import sys
 
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+
+# RFC 822 / 1123 dates as found in RSS pubDate, e.g. "Sun, 15 Jun 2025 16:52:25 +0000"
+_RFC822_RE = re.compile(
+    r'^(?:[A-Za-z]{3},\s*)?\d{1,2}\s+[A-Za-z]{3}\s+\d{4}\s+\d{1,2}:\d{2}(?::\d{2})?'
+    r'\s+(?:[+-]\d{4}|UT|UTC|GMT|Z|[ECMP][SD]T)$')
+
+# ISO 8601 dates as found in Atom feeds, e.g. "2025-06-15T16:52:25Z"
+_ISO8601_RE = re.compile(
+    r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?$')
+
+_RFC822_MONTHS = {'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'}
+
+
+def _parse_fast(pubDate):
+    """Parses RFC 822 and ISO 8601 dates without dateparser, or returns None."""
+    if _RFC822_RE.match(pubDate):
+        # The regex lets any three letters through as a month; leave the rest to dateparser
+        month = pubDate.split(',')[-1].split()[1].lower()
+        if month in _RFC822_MONTHS:
+            return parsedate_to_datetime(pubDate)
+    elif _ISO8601_RE.match(pubDate):
+        return datetime.fromisoformat(pubDate)
+    return None
+
+
+@lru_cache(maxsize=8192)
+def parse_pub_date(pubDate):
+    """
+    Parses a feed pubDate into a datetime, keeping the timezone given in the string.
+
+    Common RFC 822 and ISO 8601 dates take a fast path; anything else falls back to
+    dateparser (imported only when needed). Returns None if the date can't be parsed.
+    """
+    pubDate = pubDate.strip()
+    try:
+        parsed = _parse_fast(pubDate)
+    except ValueError:
+        parsed = None
+    if parsed is not None:
+        return parsed
+
+    import dateparser
+    return dateparser.parse(pubDate)
+
+
+def pub_timestamp(pubDate):
+    """Returns the pubDate as UTC epoch seconds (naive dates are taken as UTC), or None."""
+    parsed = parse_pub_date(pubDate)
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def migrate_pub_ts(conn):
+    """
+    Adds the rss_items.pub_ts column (UTC epoch seconds) and its indexes if missing.
+
+    Runs once per database: existing rows are backfilled from their pubDate strings.
+    """
+    conn.execute('BEGIN IMMEDIATE')  # serialize concurrent downloaders
+    try:
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(rss_items)')}
+        if 'pub_ts' not in columns:
+            conn.execute('ALTER TABLE rss_items ADD COLUMN pub_ts INTEGER')
+            rows = conn.execute('SELECT rowid, pubDate FROM rss_items').fetchall()
+            conn.executemany('UPDATE rss_items SET pub_ts = ? WHERE rowid = ?',
+                             [(pub_timestamp(pubDate), rowid) for rowid, pubDate in rows])
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_rss_items_pub_ts ON rss_items (pub_ts)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_rss_items_source_pub_ts ON rss_items (source, pub_ts)')
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
 def generate_filename(title, pubDate):
     """Creates an MD5 hash-based filename using title and sanitized timestamp."""
-    sanitized_timestamp = dateparser.parse(pubDate).strftime("%Y_%m_%d_%H_%M_%S")
+    sanitized_timestamp = parse_pub_date(pubDate).strftime("%Y_%m_%d_%H_%M_%S")
     hash_value = hashlib.md5(title.encode()).hexdigest()
     return f"{sanitized_timestamp}_{hash_value}.xml"
 